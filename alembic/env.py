@@ -1,19 +1,21 @@
 from __future__ import with_statement
 import sys
 import os
+from functools import partial
 
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
+from sqlalchemy import engine_from_config, make_url
 from sqlalchemy import pool
 
 from alembic import context
 
 from db.database import Base
 from db import models
+from db.search import include_object
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -21,7 +23,7 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -38,7 +40,7 @@ target_metadata = Base.metadata
 from dotenv import load_dotenv
 load_dotenv()
 
-DATABASE_URL = os.getenv('DATABASE_URL')
+DATABASE_URL = config.attributes.get('database_url') or os.getenv('DATABASE_URL')
 if DATABASE_URL:
     config.set_main_option("sqlalchemy.url", DATABASE_URL)
 else:
@@ -61,6 +63,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=partial(include_object, dialect=make_url(url).get_backend_name()),
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -84,7 +87,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=partial(include_object, dialect=connection.dialect.name),
         )
 
         with context.begin_transaction():
@@ -0,0 +1,28 @@
+"""Add users.deleted_at for background account purges
+
+Revision ID: 0a7e3b5c9d21
+Revises: f1c6d8a20b93
+Create Date: 2026-10-16 17:24:48.190372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7e3b5c9d21'
+down_revision: Union[str, Sequence[str], None] = 'f1c6d8a20b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'deleted_at')
@@ -0,0 +1,33 @@
+"""Add keyset pagination index on diary entries
+
+Revision ID: 3c1d7e5a9b20
+Revises: 9ffaafaa5943
+Create Date: 2026-10-16 09:12:04.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d7e5a9b20'
+down_revision: Union[str, Sequence[str], None] = '9ffaafaa5943'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_diary_entries_user_id_created_at_id',
+        'diary_entries',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_diary_entries_user_id_created_at_id', table_name='diary_entries')
@@ -0,0 +1,106 @@
+"""Store long entry content compressed
+
+Revision ID: 4e8b2d6f1a93
+Revises: 0a7e3b5c9d21
+Create Date: 2026-10-16 16:05:12.448201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from core.config import settings
+from db.compression import compress_text, decompress_text, register_sqlite_functions
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8b2d6f1a93'
+down_revision: Union[str, Sequence[str], None] = '0a7e3b5c9d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+# The decompressing SQL function register_sqlite_functions() installs, frozen
+# here so later renames in db.compression cannot change this revision's DDL
+TEXT_FUNCTION = 'diary_text'
+
+
+def _create_search_index(source: str, text) -> None:
+    op.execute(
+        "CREATE VIRTUAL TABLE diary_entries_fts USING fts5("
+        f"title, content, content='{source}', content_rowid='id', tokenize='porter unicode61')"
+    )
+    op.execute(
+        "CREATE TRIGGER diary_entries_fts_ai AFTER INSERT ON diary_entries BEGIN "
+        f"INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, {text('new')}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER diary_entries_fts_ad AFTER DELETE ON diary_entries BEGIN "
+        f"INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, {text('old')}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER diary_entries_fts_au AFTER UPDATE OF title, content ON diary_entries BEGIN "
+        f"INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, {text('old')}); "
+        f"INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, {text('new')}); END"
+    )
+
+def _drop_search_index() -> None:
+    op.execute("DROP TRIGGER diary_entries_fts_au")
+    op.execute("DROP TRIGGER diary_entries_fts_ad")
+    op.execute("DROP TRIGGER diary_entries_fts_ai")
+    op.execute("DROP TABLE diary_entries_fts")
+
+def _rewrite_content(condition: str, convert) -> None:
+    """Rewrite matching rows' content in id order, one batch per statement"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(f"SELECT id, content FROM diary_entries WHERE id > :last_id AND {condition} ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("UPDATE diary_entries SET content = :content WHERE id = :id"),
+            [{"id": row.id, "content": convert(row.content)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL already compresses long text in TOAST and builds search_vector
+    # from the plain text, so content stays as it is there
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    register_sqlite_functions(op.get_bind().connection.driver_connection)
+
+    _drop_search_index()
+    op.execute(
+        "CREATE VIEW diary_entries_text AS "
+        f"SELECT id, title, {TEXT_FUNCTION}(content) AS content FROM diary_entries"
+    )
+    _create_search_index('diary_entries_text', lambda row: f"{TEXT_FUNCTION}({row}.content)")
+
+    min_bytes = settings.content_compression_min_bytes
+    _rewrite_content(
+        f"typeof(content) = 'text' AND length(CAST(content AS BLOB)) >= {int(min_bytes)}",
+        lambda content: compress_text(content, min_bytes),
+    )
+    op.execute("INSERT INTO diary_entries_fts(diary_entries_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    register_sqlite_functions(op.get_bind().connection.driver_connection)
+
+    _rewrite_content("typeof(content) = 'blob'", decompress_text)
+    _drop_search_index()
+    op.execute("DROP VIEW diary_entries_text")
+    _create_search_index('diary_entries', lambda row: f"{row}.content")
+    op.execute("INSERT INTO diary_entries_fts(diary_entries_fts) VALUES ('rebuild')")
@@ -0,0 +1,80 @@
+"""Portable server default for diary_entries.created_at
+
+Revision ID: 6d2f9a4c8e15
+Revises: 9b3e6c1d4f27
+Create Date: 2026-10-16 19:41:07.215834
+
+"""
+from typing import Sequence, Union
+import warnings
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2f9a4c8e15'
+down_revision: Union[str, Sequence[str], None] = '9b3e6c1d4f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Batch mode rebuilds diary_entries on SQLite. Triggers and the view that read
+# it have to go first, and the indexes reflection cannot copy (the DESC
+# keyset index, the month-day expression index) are recreated afterwards.
+SQLITE_DEPENDENTS = [
+    "DROP TRIGGER diary_entries_fts_au",
+    "DROP TRIGGER diary_entries_fts_ad",
+    "DROP TRIGGER diary_entries_fts_ai",
+    "DROP VIEW diary_entries_text",
+]
+
+# Frozen copy of the search DDL as of this revision; diary_text() is the
+# decompressing function every app connection registers
+SQLITE_RESTORE = [
+    "CREATE VIEW diary_entries_text AS "
+    "SELECT id, title, diary_text(content) AS content FROM diary_entries",
+    "CREATE TRIGGER diary_entries_fts_ai AFTER INSERT ON diary_entries BEGIN "
+    "INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, diary_text(new.content)); END",
+    "CREATE TRIGGER diary_entries_fts_ad AFTER DELETE ON diary_entries BEGIN "
+    "INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, diary_text(old.content)); END",
+    "CREATE TRIGGER diary_entries_fts_au AFTER UPDATE OF title, content ON diary_entries BEGIN "
+    "INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, diary_text(old.content)); "
+    "INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, diary_text(new.content)); END",
+    "DROP INDEX ix_diary_entries_user_id_created_at_id",
+    "CREATE INDEX ix_diary_entries_user_id_created_at_id ON diary_entries (user_id, created_at DESC, id DESC)",
+    "CREATE INDEX ix_diary_entries_user_id_month_day ON diary_entries "
+    "(user_id, CAST(strftime('%m%d', created_at) AS INTEGER))",
+]
+
+
+def _set_created_at_default(default) -> None:
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        for statement in SQLITE_DEPENDENTS:
+            op.execute(statement)
+    with warnings.catch_warnings():
+        # The expression index it warns about is recreated from SQLITE_RESTORE
+        warnings.filterwarnings('ignore', "Skipped unsupported reflection of expression-based index", sa.exc.SAWarning)
+        with op.batch_alter_table('diary_entries') as batch_op:
+            batch_op.alter_column(
+                'created_at',
+                existing_type=sa.DateTime(timezone=True),
+                existing_nullable=True,
+                server_default=default,
+            )
+    if sqlite:
+        for statement in SQLITE_RESTORE:
+            op.execute(statement)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() only exists on PostgreSQL; SQLite accepted the DDL and then failed every insert
+    _set_created_at_default(sa.func.current_timestamp())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_created_at_default(sa.text('now()'))
@@ -0,0 +1,59 @@
+"""Add full-text search over diary entries
+
+Revision ID: 7a4f2c91d0e3
+Revises: 3c1d7e5a9b20
+Create Date: 2026-10-16 10:02:37.551920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4f2c91d0e3'
+down_revision: Union[str, Sequence[str], None] = '3c1d7e5a9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "ALTER TABLE diary_entries ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))) STORED"
+        )
+        op.execute("CREATE INDEX ix_diary_entries_search_vector ON diary_entries USING gin (search_vector)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE diary_entries_fts USING fts5("
+            "title, content, content='diary_entries', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER diary_entries_fts_ai AFTER INSERT ON diary_entries BEGIN "
+            "INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER diary_entries_fts_ad AFTER DELETE ON diary_entries BEGIN "
+            "INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER diary_entries_fts_au AFTER UPDATE OF title, content ON diary_entries BEGIN "
+            "INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+            "INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        op.execute("INSERT INTO diary_entries_fts(diary_entries_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_diary_entries_search_vector', table_name='diary_entries')
+        op.drop_column('diary_entries', 'search_vector')
+    else:
+        op.execute("DROP TRIGGER diary_entries_fts_au")
+        op.execute("DROP TRIGGER diary_entries_fts_ad")
+        op.execute("DROP TRIGGER diary_entries_fts_ai")
+        op.execute("DROP TABLE diary_entries_fts")
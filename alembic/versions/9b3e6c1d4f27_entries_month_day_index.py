@@ -0,0 +1,39 @@
+"""Index entries by user and UTC month-day
+
+Revision ID: 9b3e6c1d4f27
+Revises: 4e8b2d6f1a93
+Create Date: 2026-10-16 17:12:40.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e6c1d4f27'
+down_revision: Union[str, Sequence[str], None] = '4e8b2d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Must match db.dialect.utc_month_day exactly, or the planner won't use the index
+    if op.get_bind().dialect.name == 'postgresql':
+        month_day = (
+            "CAST(EXTRACT(MONTH FROM timezone('UTC', created_at)) * 100 "
+            "+ EXTRACT(DAY FROM timezone('UTC', created_at)) AS INTEGER)"
+        )
+    else:
+        month_day = "CAST(strftime('%m%d', created_at) AS INTEGER)"
+    op.create_index(
+        'ix_diary_entries_user_id_month_day', 'diary_entries',
+        ['user_id', sa.text(month_day)], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_diary_entries_user_id_month_day', table_name='diary_entries')
@@ -0,0 +1,42 @@
+"""Add mood_daily_rollup table
+
+Revision ID: b52e8d03f6a1
+Revises: 7a4f2c91d0e3
+Create Date: 2026-10-16 11:20:45.304117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b52e8d03f6a1'
+down_revision: Union[str, Sequence[str], None] = '7a4f2c91d0e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('mood_daily_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('mood', postgresql.ENUM('HAPPY', 'NEUTRAL', 'SAD', 'EXCITED', 'CALM', name='moodenum', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'mood')
+    )
+    day = "date(timezone('UTC', created_at))" if op.get_bind().dialect.name == 'postgresql' else "date(created_at)"
+    op.execute(
+        "INSERT INTO mood_daily_rollup (user_id, day, mood, count) "
+        f"SELECT user_id, {day}, mood, count(*) FROM diary_entries "
+        f"WHERE mood IS NOT NULL GROUP BY user_id, {day}, mood"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('mood_daily_rollup')
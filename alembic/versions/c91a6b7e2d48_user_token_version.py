@@ -0,0 +1,28 @@
+"""Add token_version to users
+
+Revision ID: c91a6b7e2d48
+Revises: b52e8d03f6a1
+Create Date: 2026-10-16 12:41:09.872530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c91a6b7e2d48'
+down_revision: Union[str, Sequence[str], None] = 'b52e8d03f6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,30 @@
+"""Add entry and diary version counters
+
+Revision ID: d3f08a5c7e16
+Revises: c91a6b7e2d48
+Create Date: 2026-10-16 13:30:52.016443
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f08a5c7e16'
+down_revision: Union[str, Sequence[str], None] = 'c91a6b7e2d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('diary_entries', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('users', sa.Column('diary_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'diary_version')
+    op.drop_column('diary_entries', 'version')
@@ -0,0 +1,47 @@
+"""Index entry_tags.tag_id and tag name prefixes, add user_tag_counts
+
+Revision ID: e5a92c4f1b07
+Revises: d3f08a5c7e16
+Create Date: 2026-10-16 15:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a92c4f1b07'
+down_revision: Union[str, Sequence[str], None] = 'd3f08a5c7e16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_entry_tags_tag_id'), 'entry_tags', ['tag_id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_tags_name_pattern', 'tags', ['name'], unique=False, postgresql_ops={'name': 'text_pattern_ops'})
+    op.create_table('user_tag_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'tag_id')
+    )
+    op.execute(
+        "INSERT INTO user_tag_counts (user_id, tag_id, count) "
+        "SELECT diary_entries.user_id, entry_tags.tag_id, count(*) FROM entry_tags "
+        "JOIN diary_entries ON diary_entries.id = entry_tags.entry_id "
+        "GROUP BY diary_entries.user_id, entry_tags.tag_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_tag_counts')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_tags_name_pattern', table_name='tags')
+    op.drop_index(op.f('ix_entry_tags_tag_id'), table_name='entry_tags')
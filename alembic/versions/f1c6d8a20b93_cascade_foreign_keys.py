@@ -0,0 +1,85 @@
+"""Index gratitude_items.entry_id, cascade deletes through foreign keys
+
+Revision ID: f1c6d8a20b93
+Revises: e5a92c4f1b07
+Create Date: 2026-10-16 16:11:05.842690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6d8a20b93'
+down_revision: Union[str, Sequence[str], None] = 'e5a92c4f1b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, referred table) for every foreign key that now cascades
+CASCADES = [
+    ('diary_entries', 'user_id', 'users'),
+    ('entry_tags', 'entry_id', 'diary_entries'),
+    ('entry_tags', 'tag_id', 'tags'),
+    ('gratitude_items', 'entry_id', 'diary_entries'),
+    ('mood_daily_rollup', 'user_id', 'users'),
+    ('user_tag_counts', 'user_id', 'users'),
+    ('user_tag_counts', 'tag_id', 'tags'),
+]
+
+# Lets batch mode find SQLite's unnamed constraints by name
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+SQLITE_FTS_TRIGGERS = [
+    "CREATE TRIGGER diary_entries_fts_ai AFTER INSERT ON diary_entries BEGIN "
+    "INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER diary_entries_fts_ad AFTER DELETE ON diary_entries BEGIN "
+    "INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER diary_entries_fts_au AFTER UPDATE OF title, content ON diary_entries BEGIN "
+    "INSERT INTO diary_entries_fts(diary_entries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO diary_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+
+def _fk_name(table: str, column: str, referred: str) -> str:
+    if op.get_bind().dialect.name == 'postgresql':
+        # PostgreSQL's name for the constraints the earlier migrations left unnamed
+        return f'{table}_{column}_fkey'
+    return f'fk_{table}_{column}_{referred}'
+
+
+def _set_ondelete(ondelete: Union[str, None]) -> None:
+    for table in dict.fromkeys(table for table, _, _ in CASCADES):
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for fk_table, column, referred in CASCADES:
+                if fk_table != table:
+                    continue
+                name = _fk_name(table, column, referred)
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+    if op.get_bind().dialect.name == 'sqlite':
+        # Batch mode rebuilt diary_entries: the FTS triggers went with the old
+        # table and the keyset index was copied without its DESC ordering
+        op.drop_index('ix_diary_entries_user_id_created_at_id', table_name='diary_entries')
+        op.create_index(
+            'ix_diary_entries_user_id_created_at_id',
+            'diary_entries',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+        )
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_gratitude_items_entry_id'), 'gratitude_items', ['entry_id'], unique=False)
+    _set_ondelete('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_ondelete(None)
+    op.drop_index(op.f('ix_gratitude_items_entry_id'), table_name='gratitude_items')
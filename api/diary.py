@@ -1,41 +1,161 @@
-from fastapi import APIRouter, status, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, status, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import and_, delete, exists, false, func, insert, select, tuple_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, load_only, raiseload, selectinload, with_expression
+from typing import Dict, Iterator, List, Optional
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+import hashlib
+import csv
+import io
+import json
+import time
 
-from schemas.diary import DiaryEntryResponse, DiaryEntryCreate
-from db.models import User, DiaryEntry, Tag, GratitudeItem
-from db.database import get_db
-from core.auth import get_current_user
+from schemas.diary import DiaryEntryResponse, DiaryEntryCreate, DiaryEntryUpdate, DiaryEntrySparse, EntryView, TagMatch, CalendarDay, CalendarResponse, BulkImportResponse, BulkImportError, BulkDeleteResponse, ExportFormat, DiaryEntrySearchResult
+from db.models import DiaryEntry, EntryTag, GratitudeItem, MoodEnum, Tag
+from db.database import DbSession, get_db, read_session, run_db
+from db.tags import resolve_tag_ids, link_tags
+from db.bulk import insert_entries
+from db.deletes import delete_entries
+from db.search import search_entries
+from db.rollups import apply_mood_deltas, apply_tag_deltas, created_between, mood_key
+from db.compression import decompress_text
+from db.dialect import plain_text, utc_date
+from db.versions import touch_diary, diary_version, entry_version
+from db.on_this_day import entries_on_this_day
+from db.entry_rows import ENTRY_COLUMNS, entry_payloads
+from core.auth import get_current_user, get_read_db, Principal
+from core.pagination import encode_cursor, decode_cursor
+from core.ndjson import aiter_lines
+from core.etag import make_etag, query_fingerprint, is_not_modified, not_modified_response
+from core.fast_json import json_response
 
 
 router = APIRouter(tags=["Diary"])
 
-@router.post("/entries", response_model=DiaryEntryResponse, status_code=status.HTTP_201_CREATED)
-def create_entry(
-    entry: DiaryEntryCreate, 
-    db: Session = Depends(get_db), 
-    user: User = Depends(get_current_user)
-):
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_IMPORT_ERRORS = 1000
+MAX_BULK_DELETE_IDS = 1000
+EXPORT_CHUNK_SIZE = 500
+EXPORT_CSV_COLUMNS = ["id", "created_at", "title", "content", "mood", "tags", "gratitude_items"]
+DEFAULT_PREVIEW_LENGTH = 200
+MAX_PREVIEW_LENGTH = 2000
+MAX_ON_THIS_DAY_ENTRIES = 100
+
+# Fields a sparse list may ask for, and what each one costs to load
+SPARSE_COLUMNS = {
+    "id": DiaryEntry.id,
+    "user_id": DiaryEntry.user_id,
+    "created_at": DiaryEntry.created_at,
+    "title": DiaryEntry.title,
+    "content": DiaryEntry.content,
+    "mood": DiaryEntry.mood,
+}
+SPARSE_RELATIONS = {
+    "tags": DiaryEntry.tags,
+    "gratitude_items": DiaryEntry.gratitude_items,
+}
+SPARSE_FIELDS = [*SPARSE_COLUMNS, "preview", *SPARSE_RELATIONS]
+SUMMARY_FIELDS = ["id", "created_at", "title", "mood", "tags"]
+FULL_FIELDS = ["id", "user_id", "created_at", "title", "content", "mood", "tags", "gratitude_items"]
+
+sparse_list_adapter = TypeAdapter(List[DiaryEntrySparse])
+
+# Batched IN loads for everything DiaryEntryResponse serializes, so a page of
+# entries costs a fixed number of queries instead of two per entry.
+entry_relations = (
+    selectinload(DiaryEntry.tags),
+    selectinload(DiaryEntry.gratitude_items),
+)
+
+
+def _tag_filter(db: Session, tags: str, match: TagMatch):
+    """Condition on DiaryEntry for the ``tags``/``match`` list filter"""
+    names = {name.strip() for name in tags.split(",") if name.strip()}
+    tag_ids = db.scalars(select(Tag.id).where(Tag.name.in_(names))).all()
+    if not tag_ids or (match is TagMatch.ALL and len(tag_ids) < len(names)):
+        return false()
+
+    # Correlated EXISTS probes hit the entry_tags primary key per entry, or the
+    # tag_id index when the planner drives the join from the tag side
+    def has_tags(*ids):
+        return exists().where(EntryTag.entry_id == DiaryEntry.id, EntryTag.tag_id.in_(ids))
+
+    if match is TagMatch.ALL:
+        return and_(*(has_tags(tag_id) for tag_id in tag_ids))
+    return has_tags(*tag_ids)
+
+
+def _requested_fields(view: EntryView, fields: Optional[str], preview: Optional[int]) -> Optional[List[str]]:
+    """Fields a list response should carry, or None for the full DiaryEntryResponse"""
+    if fields:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(requested) - set(SPARSE_FIELDS))
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(SPARSE_FIELDS)}"
+            )
+    elif view is EntryView.SUMMARY:
+        requested = list(SUMMARY_FIELDS)
+    elif preview is not None:
+        requested = list(FULL_FIELDS)
+    else:
+        return None
+    if preview is not None and "preview" not in requested:
+        requested.append("preview")
+    return requested
+
+
+def _sparse_options(fields: List[str], preview: Optional[int]) -> list:
+    """Load only what ``fields`` needs; anything else raises instead of lazy loading"""
+    # id and created_at are always read, the cursor is built from them
+    columns = [SPARSE_COLUMNS[name] for name in fields if name in SPARSE_COLUMNS]
+    options = [load_only(DiaryEntry.id, DiaryEntry.created_at, *columns)]
+    options += [selectinload(SPARSE_RELATIONS[name]) for name in fields if name in SPARSE_RELATIONS]
+    if "preview" in fields:
+        length = preview or DEFAULT_PREVIEW_LENGTH
+        options.append(with_expression(DiaryEntry.preview, func.substr(plain_text(DiaryEntry.content), 1, length)))
+    options.append(raiseload("*"))
+    return options
+
+
+def _get_entry(db: Session, entry_id: int, user_id: int) -> DiaryEntry:
+    # AsyncSessions keep objects unexpired across commits, so reload whatever
+    # the identity map already holds rather than serializing stale state
+    entry = (
+        db.query(DiaryEntry)
+        .options(*entry_relations)
+        .filter_by(id=entry_id, user_id=user_id)
+        .populate_existing()
+        .first()
+    )
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail="Entry not found"
+        )
+    return entry
+
+
+def _create_entry(db: Session, user_id: int, entry: DiaryEntryCreate) -> DiaryEntry:
     db_entry = DiaryEntry(
-        user_id=user.id,
+        user_id=user_id,
         title=entry.title,
         content=entry.content,
         mood=entry.mood
     )
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
+    db.flush()
 
     # Add tags
     if entry.tags:
-        for tag_name in entry.tags:
-            tag = db.query(Tag).filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.add(tag)
-                db.commit()
-                db.refresh(tag)
-            db_entry.tags.append(tag)
+        tag_ids = resolve_tag_ids(db, entry.tags)
+        link_tags(db, db_entry.id, tag_ids.values())
+        apply_tag_deltas(db, user_id, Counter(tag_ids.values()))
 
     # Add gratitude items
     if entry.gratitude_items:
@@ -43,99 +163,539 @@ def create_entry(
             gratitude = GratitudeItem(entry_id=db_entry.id, content=content)
             db.add(gratitude)
 
+    apply_mood_deltas(db, user_id, Counter([mood_key(db_entry.created_at, db_entry.mood)]))
+    touch_diary(db, user_id)
     db.commit()
-    db.refresh(db_entry)
-    return db_entry
+    return _get_entry(db, db_entry.id, user_id)
+
+
+@router.post("/entries", response_model=DiaryEntryResponse, status_code=status.HTTP_201_CREATED)
+async def create_entry(
+    entry: DiaryEntryCreate, 
+    db: DbSession = Depends(get_db), 
+    user: Principal = Depends(get_current_user)
+):
+    return await run_db(db, _create_entry, user.id, entry)
+
+
+@router.post(
+    "/entries/bulk", response_model=BulkImportResponse,
+    responses={status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {"model": BulkImportResponse}},
+)
+async def bulk_import_entries(
+    request: Request,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=MAX_IMPORT_BATCH_SIZE),
+    db: DbSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Import an NDJSON stream of entries, one DiaryEntryCreate object per line.
+
+    The body is parsed as it arrives and written in batches of ``batch_size``,
+    each batch in its own transaction. Invalid lines are skipped and reported.
+
+    A line over core.ndjson.MAX_LINE_BYTES stops the import with a 413 whose
+    body is the usual summary: the lines before it are imported or reported
+    as usual, the oversized line is counted as failed, and nothing after it
+    is read.
+    """
+    started = time.perf_counter()
+    errors: List[BulkImportError] = []
+    failed = imported = batches = 0
+    tag_ids = {}
+    batch = []
+
+    def record_error(line: int, error: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+            errors.append(BulkImportError(line=line, error=error))
+
+    async def flush():
+        nonlocal imported, batches, tag_ids
+        known_tags = dict(tag_ids)
+        try:
+            await run_db(db, insert_entries, user.id, [entry for _, entry in batch], tag_ids)
+        except SQLAlchemyError as exc:
+            await run_db(db, Session.rollback)
+            tag_ids = known_tags
+            for line, _ in batch:
+                record_error(line, f"Batch failed: {exc.__class__.__name__}")
+        else:
+            imported += len(batch)
+        batches += 1
+        batch.clear()
+
+    line_number = 0
+    stopped: Optional[HTTPException] = None
+    try:
+        async for line in aiter_lines(request.stream()):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                batch.append((line_number, DiaryEntryCreate.model_validate_json(line)))
+            except ValidationError as exc:
+                record_error(line_number, "; ".join(
+                    f"{'.'.join(map(str, err['loc'])) or 'line'}: {err['msg']}"
+                    for err in exc.errors(include_url=False)
+                ))
+                continue
+            if len(batch) >= batch_size:
+                await flush()
+    except HTTPException as exc:
+        if exc.status_code != status.HTTP_413_REQUEST_ENTITY_TOO_LARGE:
+            raise
+        # Earlier batches are committed, so the caller needs to know how far it got
+        stopped = exc
+        record_error(line_number + 1, exc.detail)
+    if batch:
+        await flush()
+
+    elapsed = time.perf_counter() - started
+    summary = BulkImportResponse(
+        imported=imported,
+        failed=failed,
+        batches=batches,
+        elapsed_seconds=round(elapsed, 3),
+        entries_per_second=round(imported / elapsed, 1) if elapsed else 0.0,
+        errors=errors,
+    )
+    if stopped is not None:
+        return JSONResponse(summary.model_dump(), status_code=stopped.status_code)
+    return summary
 
 
 @router.get("/entries", response_model=List[DiaryEntryResponse])
-def get_entries(
+async def get_entries(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = None,
+    tags: Optional[str] = None,
+    match: TagMatch = TagMatch.ANY,
+    view: EntryView = EntryView.FULL,
+    fields: Optional[str] = None,
+    preview: Optional[int] = Query(None, ge=1, le=MAX_PREVIEW_LENGTH),
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
 ):
-    return (
-        db.query(DiaryEntry)
-        .filter(DiaryEntry.user_id == user.id)
-        .order_by(DiaryEntry.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    """List entries newest first.
+
+    Pass the ``X-Next-Cursor`` header of a page back as ``cursor`` to fetch the
+    next one; keyset pages cost the same at any depth, unlike ``skip``.
+    ``from`` and ``to`` limit the list to entries created on those UTC days,
+    inclusive. ``tags=a,b`` keeps entries with any (``match=any``) or all
+    (``match=all``) of those tags. Send ``If-None-Match`` to get a 304 while nothing in the diary has changed.
+
+    ``view=summary`` returns only id, date, title, mood and tags, and
+    ``fields=title,mood,...`` picks any subset; neither reads the columns or
+    relationships left out. ``preview=N`` adds the first N characters of the
+    content, truncated by the database.
+    """
+    def load(db: Session):
+        etag = make_etag("entries", user.id, diary_version(db, user.id), query_fingerprint(request))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
+
+        requested = _requested_fields(view, fields, preview)
+        # Full entries are read as plain rows; sparse ones need the ORM's deferred loading
+        if requested is None:
+            query = db.query(*ENTRY_COLUMNS)
+        else:
+            query = db.query(DiaryEntry).options(*_sparse_options(requested, preview))
+        query = (
+            query
+            .filter(DiaryEntry.user_id == user.id)
+            .order_by(DiaryEntry.created_at.desc(), DiaryEntry.id.desc())
+        )
+        # Both bounds are range conditions on the (user_id, created_at, id) index
+        query = query.filter(*created_between(from_, to))
+        if tags:
+            query = query.filter(_tag_filter(db, tags, match))
+        if cursor:
+            created_at, entry_id = decode_cursor(cursor)
+            position = tuple_(
+                created_at, entry_id,
+                types=[DiaryEntry.created_at.type, DiaryEntry.id.type]
+            )
+            query = query.filter(tuple_(DiaryEntry.created_at, DiaryEntry.id) < position)
+        else:
+            query = query.offset(skip)
+
+        entries = query.limit(limit).all()
+        if entries and len(entries) == limit:
+            last = entries[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+        if requested is None:
+            return json_response(entry_payloads(db, entries), headers=dict(response.headers))
+
+        sparse = [
+            DiaryEntrySparse.model_validate({name: getattr(entry, name) for name in requested}, from_attributes=True)
+            for entry in entries
+        ]
+        return Response(
+            content=sparse_list_adapter.dump_json(sparse, exclude_unset=True),
+            media_type="application/json",
+            headers=dict(response.headers),
+        )
+
+    return await run_db(db, load)
+
+
+def _export_chunks(user_id: int, export_format: ExportFormat) -> Iterator[bytes]:
+    """Yield the user's diary, oldest first, one encoded chunk per partition"""
+    # The route's session is closed once the response starts; the stream
+    # holds its own for as long as the client keeps reading.
+    with read_session(user_id) as db:
+        result = db.scalars(
+            select(DiaryEntry)
+            .options(*entry_relations)
+            .where(DiaryEntry.user_id == user_id)
+            .order_by(DiaryEntry.created_at, DiaryEntry.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        if export_format is ExportFormat.CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_CSV_COLUMNS)
+            for partition in result.partitions():
+                for entry in partition:
+                    writer.writerow([
+                        entry.id,
+                        entry.created_at.isoformat(),
+                        entry.title,
+                        decompress_text(entry.content),
+                        entry.mood.value if entry.mood else "",
+                        json.dumps([tag.name for tag in entry.tags]),
+                        json.dumps([item.content for item in entry.gratitude_items]),
+                    ])
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            for partition in result.partitions():
+                yield "".join(
+                    DiaryEntryResponse.model_validate(entry).model_dump_json() + "\n"
+                    for entry in partition
+                ).encode()
+
+
+@router.get("/entries/export")
+def export_entries(
+    format: ExportFormat = ExportFormat.NDJSON,
+    user: Principal = Depends(get_current_user)
+):
+    """Stream the user's whole diary as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and sent as they are fetched,
+    so memory stays flat regardless of how many entries the user has.
+    """
+    media_type = "text/csv" if format is ExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        _export_chunks(user.id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="diary.{format.value}"'},
     )
 
 
+@router.get("/entries/calendar", response_model=CalendarResponse)
+async def entry_calendar(
+    request: Request,
+    response: Response,
+    year: int = Query(ge=1, le=9999),
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Entry count and most frequent mood for each day of ``year`` with entries.
+
+    One grouped query over an index range scan of that year, so the cost
+    depends on a year's entries rather than on the size of the diary.
+    """
+    def load(db: Session):
+        etag = make_etag("calendar", user.id, diary_version(db, user.id), year)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
+
+        day = utc_date(DiaryEntry.created_at)
+        rows = db.execute(
+            select(day, DiaryEntry.mood, func.count())
+            .where(
+                DiaryEntry.user_id == user.id,
+                *created_between(date(year, 1, 1), date(year, 12, 31)),
+            )
+            .group_by(day, DiaryEntry.mood)
+        )
+
+        counts: Dict[date, Counter] = defaultdict(Counter)
+        for entry_day, mood, count in rows:
+            counts[entry_day][mood] += count
+        mood_order = list(MoodEnum)
+        days = []
+        for entry_day, moods in sorted(counts.items()):
+            logged = [(count, -mood_order.index(mood), mood) for mood, count in moods.items() if mood is not None]
+            days.append(CalendarDay(
+                day=entry_day,
+                count=sum(moods.values()),
+                # Ties go to the mood declared first in MoodEnum
+                dominant_mood=max(logged)[2] if logged else None,
+            ))
+        return CalendarResponse(year=year, days=days)
+
+    return await run_db(db, load)
+
+
+@router.get("/entries/on-this-day", response_model=List[DiaryEntryResponse])
+async def on_this_day(
+    request: Request,
+    response: Response,
+    day: Optional[date] = Query(None, alias="date"),
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Entries written on this month and day in earlier years, newest first.
+
+    ``date`` defaults to today in UTC. The result is cached per user and day
+    until the user's diary next changes; while it is, a request (or a 304
+    for ``If-None-Match``) costs one primary key lookup of the diary version.
+    """
+    day = day or datetime.now(timezone.utc).date()
+    cache = request.app.state.on_this_day_cache
+    # Read before the entries, so a cached result is never older than its version
+    version = await run_db(db, diary_version, user.id)
+    cached = cache.get(user.id, day, version)
+    if cached is None:
+        entries = await run_db(db, entries_on_this_day, user.id, day, MAX_ON_THIS_DAY_ENTRIES, entry_relations)
+        payload = [DiaryEntryResponse.model_validate(entry) for entry in entries]
+        digest = hashlib.blake2b(repr([(entry.id, entry.version) for entry in entries]).encode(), digest_size=8).hexdigest()
+        cached = (make_etag("on-this-day", user.id, day.isoformat(), digest), payload)
+        cache.put(user.id, day, version, *cached)
+    etag, payload = cached
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    return payload
+
+
+@router.get("/entries/search", response_model=List[DiaryEntrySearchResult])
+async def search(
+    q: str = Query(min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Full-text search over entry titles and content, best matches first"""
+    if not q.strip():
+        return []
+    results = await run_db(db, search_entries, user.id, q, limit, entry_relations)
+    return [
+        {"entry": entry, "rank": rank, "snippet": snippet}
+        for entry, rank, snippet in results
+    ]
+
+
 @router.get("/entries/{entry_id}", response_model=DiaryEntryResponse)
-def read_entry(
+async def read_entry(
     entry_id: int,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
 ):
-    entry = db.query(DiaryEntry).filter_by(id=entry_id, user_id=user.id).first()
-    if not entry:
+    def load(db: Session):
+        version = entry_version(db, entry_id, user.id)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail="Entry not found"
+            )
+        etag = make_etag("entry", entry_id, version)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
+        row = db.execute(
+            select(*ENTRY_COLUMNS).where(DiaryEntry.id == entry_id, DiaryEntry.user_id == user.id)
+        ).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail="Entry not found"
+            )
+        return json_response(entry_payloads(db, [row])[0], headers=dict(response.headers))
+
+    return await run_db(db, load)
+
+
+def _apply_entry_changes(db: Session, db_entry: DiaryEntry, changes: dict, user_id: int) -> bool:
+    """Write only the rows ``changes`` actually alters; returns whether anything changed.
+
+    Scalar fields and the version bump go out as one UPDATE. Tags and
+    gratitude items are diffed against the loaded collections, so unchanged
+    links and items are never deleted and re-inserted.
+    """
+    current = {"title": db_entry.title, "mood": db_entry.mood}
+    if "content" in changes:
+        # Loaded as stored; only a request that sets content needs it as text
+        current["content"] = decompress_text(db_entry.content)
+    values = {
+        name: changes[name]
+        for name in current
+        if name in changes and changes[name] != current[name]
+    }
+    changed = bool(values)
+
+    if "mood" in values:
+        apply_mood_deltas(db, user_id, Counter({
+            mood_key(db_entry.created_at, db_entry.mood): -1,
+            mood_key(db_entry.created_at, values["mood"]): 1,
+        }))
+
+    if "tags" in changes:
+        current = {tag.name: tag.id for tag in db_entry.tags}
+        wanted = list(dict.fromkeys(changes["tags"] or []))
+        removed = [tag_id for name, tag_id in current.items() if name not in wanted]
+        added = resolve_tag_ids(db, [name for name in wanted if name not in current])
+        if removed:
+            db.execute(delete(EntryTag).where(EntryTag.entry_id == db_entry.id, EntryTag.tag_id.in_(removed)))
+        link_tags(db, db_entry.id, added.values())
+        tag_deltas = Counter(added.values())
+        tag_deltas.subtract(removed)
+        apply_tag_deltas(db, user_id, tag_deltas)
+        changed = changed or bool(removed or added)
+
+    if "gratitude_items" in changes:
+        # Match items by content; duplicates are counted, order is not significant
+        missing = Counter(changes["gratitude_items"] or [])
+        stale = []
+        for item in db_entry.gratitude_items:
+            if missing[item.content] > 0:
+                missing[item.content] -= 1
+            else:
+                stale.append(item.id)
+        if stale:
+            db.execute(delete(GratitudeItem).where(GratitudeItem.id.in_(stale)))
+        new_items = [{"entry_id": db_entry.id, "content": content} for content in missing.elements()]
+        if new_items:
+            db.execute(insert(GratitudeItem), new_items)
+        changed = changed or bool(stale or new_items)
+
+    if changed:
+        db.execute(
+            update(DiaryEntry)
+            .where(DiaryEntry.id == db_entry.id)
+            .values(**values, version=DiaryEntry.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        touch_diary(db, user_id)
+    return changed
+
+
+def _update_entry(db: Session, entry_id: int, user_id: int, changes: dict) -> DiaryEntry:
+    db_entry = _get_entry(db, entry_id, user_id)
+    if _apply_entry_changes(db, db_entry, changes, user_id):
+        db.commit()
+    return _get_entry(db, entry_id, user_id)
+
+
+def _patch_entry(db: Session, entry_id: int, user_id: int, changes: dict) -> DiaryEntry:
+    relations = [relation for name, relation in SPARSE_RELATIONS.items() if name in changes]
+    db_entry = (
+        db.query(DiaryEntry)
+        .options(*(selectinload(relation) for relation in relations))
+        .filter_by(id=entry_id, user_id=user_id)
+        .first()
+    )
+    if not db_entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Entry not found"
         )
-    return entry
+    if _apply_entry_changes(db, db_entry, changes, user_id):
+        db.commit()
+    return _get_entry(db, entry_id, user_id)
+
+
+def _delete_matching(db: Session, user_id: int, *criteria) -> int:
+    deleted = delete_entries(db, user_id, *criteria)
+    db.commit()
+    return deleted
 
 
 @router.put("/entries/{entry_id}", response_model=DiaryEntryResponse)
-def update_entry(
+async def update_entry(
     entry_id: int,
     entry_update: DiaryEntryCreate,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
 ):
-    db_entry = db.query(DiaryEntry).filter_by(id=entry_id, user_id=user.id).first()
-    if not db_entry:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail="Entry not found"
-        )
+    changes = entry_update.model_dump()
+    changes["tags"] = changes["tags"] or []
+    changes["gratitude_items"] = changes["gratitude_items"] or []
+    return await run_db(db, _update_entry, entry_id, user.id, changes)
 
-    db_entry.title = entry_update.title
-    db_entry.content = entry_update.content
-    db_entry.mood = entry_update.mood
-
-    # Update tags
-    db_entry.tags.clear()
-    for tag_name in entry_update.tags or []:
-        tag = db.query(Tag).filter_by(name=tag_name).first()
-        if not tag:
-            tag = Tag(name=tag_name)
-            db.add(tag)
-            db.commit()
-            db.refresh(tag)
-        db_entry.tags.append(tag)
-
-    # Update gratitude items
-    db.query(GratitudeItem).filter_by(entry_id=entry_id).delete()
-    for content in entry_update.gratitude_items or []:
-        db.add(GratitudeItem(entry_id=entry_id, content=content))
 
-    db.commit()
-    db.refresh(db_entry)
-    return db_entry
+@router.patch("/entries/{entry_id}", response_model=DiaryEntryResponse)
+async def patch_entry(
+    entry_id: int,
+    entry_patch: DiaryEntryUpdate,
+    db: DbSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Change only the fields present in the body, writing only the rows that differ"""
+    changes = entry_patch.model_dump(exclude_unset=True)
+    return await run_db(db, _patch_entry, entry_id, user.id, changes)
+
+
+@router.delete("/entries", response_model=BulkDeleteResponse)
+async def delete_entries_bulk(
+    ids: Optional[str] = None,
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = None,
+    db: DbSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Delete entries by ``ids=1,2,3`` and/or created between ``from`` and ``to`` (inclusive UTC days).
+
+    At least one filter is required; when several are given an entry must match all of them.
+    """
+    criteria = []
+    if ids:
+        try:
+            entry_ids = {int(entry_id) for entry_id in ids.split(",") if entry_id.strip()}
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ids must be a comma-separated list of integers"
+            )
+        if len(entry_ids) > MAX_BULK_DELETE_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAX_BULK_DELETE_IDS} ids per request"
+            )
+        criteria.append(DiaryEntry.id.in_(entry_ids))
+    criteria += created_between(from_, to)
+    if not criteria:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass ids, from or to"
+        )
+    deleted = await run_db(db, _delete_matching, user.id, *criteria)
+    return BulkDeleteResponse(deleted=deleted)
 
 
 @router.delete("/entries/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_entry(
+async def delete_entry(
     entry_id: int,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
 ):
-    db_entry = db.query(DiaryEntry).filter_by(id=entry_id, user_id=user.id).first()
-    if not db_entry:
+    if not await run_db(db, _delete_matching, user.id, DiaryEntry.id == entry_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Entry not found"
         )
-
-    # Delete gratitude items and tags association
-    db.query(GratitudeItem).filter_by(entry_id=entry_id).delete()
-    db_entry.tags.clear()
-
-    db.delete(db_entry)
-    db.commit()
     return
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from schemas.stats import Granularity, MoodBucket, MoodStatsResponse, MoodStreaks
+from db.models import MoodDailyRollup, MoodEnum
+from db.database import DbSession, run_db
+from core.auth import get_current_user, get_read_db, Principal
+
+
+router = APIRouter(tags=["Stats"])
+
+def _period_start(day: date, granularity: Granularity) -> date:
+    if granularity is Granularity.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity is Granularity.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def _streaks(days: List[date], today: date) -> MoodStreaks:
+    """Runs of consecutive days with at least one mood logged"""
+    longest = run = 0
+    previous = None
+    for day in days:
+        run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    # A streak is still current if the last logged day is today or yesterday
+    current = run if previous and today - previous <= timedelta(days=1) else 0
+    return MoodStreaks(current=current, longest=longest)
+
+
+@router.get("/stats/mood", response_model=MoodStatsResponse)
+async def mood_stats(
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = None,
+    granularity: Granularity = Granularity.DAY,
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Mood counts per day, week or month, served from the daily rollup"""
+    def load(db: Session):
+        query = (
+            select(MoodDailyRollup.day, MoodDailyRollup.mood, MoodDailyRollup.count)
+            .where(MoodDailyRollup.user_id == user.id, MoodDailyRollup.count > 0)
+        )
+        if from_:
+            query = query.where(MoodDailyRollup.day >= from_)
+        if to:
+            query = query.where(MoodDailyRollup.day <= to)
+
+        buckets: Dict[date, Dict[MoodEnum, int]] = defaultdict(lambda: defaultdict(int))
+        for day, mood, count in db.execute(query):
+            buckets[_period_start(day, granularity)][mood] += count
+
+        logged_days = db.scalars(
+            select(MoodDailyRollup.day)
+            .where(MoodDailyRollup.user_id == user.id, MoodDailyRollup.count > 0)
+            .distinct()
+            .order_by(MoodDailyRollup.day)
+        ).all()
+        return MoodStatsResponse(
+            granularity=granularity,
+            buckets=[
+                MoodBucket(period_start=start, counts=counts, total=sum(counts.values()))
+                for start, counts in sorted(buckets.items())
+            ],
+            streaks=_streaks(logged_days, datetime.now(timezone.utc).date()),
+        )
+
+    return await run_db(db, load)
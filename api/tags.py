@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List
+
+from schemas.diary import TagUsage
+from db.models import Tag, UserTagCount
+from db.database import DbSession, run_db
+from core.auth import get_current_user, get_read_db, Principal
+
+
+router = APIRouter(tags=["Tags"])
+
+MAX_SUGGESTIONS = 50
+
+
+def _usage_query(user_id: int):
+    return (
+        select(Tag.id, Tag.name, UserTagCount.count)
+        .join(UserTagCount, UserTagCount.tag_id == Tag.id)
+        .where(UserTagCount.user_id == user_id, UserTagCount.count > 0)
+        .order_by(UserTagCount.count.desc(), Tag.name)
+    )
+
+
+def _fetch_usage(db: Session, query) -> list:
+    return db.execute(query).mappings().all()
+
+
+@router.get("/tags", response_model=List[TagUsage])
+async def list_tags(
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
+):
+    """The user's tags with how many of their entries use each, most used first"""
+    return await run_db(db, _fetch_usage, _usage_query(user.id))
+
+
+@router.get("/tags/suggest", response_model=List[TagUsage])
+async def suggest_tags(
+    prefix: str = Query(min_length=1),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: DbSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Autocomplete: the user's tags starting with ``prefix``, most used first"""
+    query = _usage_query(user.id).where(Tag.name.startswith(prefix, autoescape=True)).limit(limit)
+    return await run_db(db, _fetch_usage, query)
@@ -1,69 +1,89 @@
-from fastapi import APIRouter, status, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, status, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from typing import Optional
 
 from schemas.user import UserResponse, UserCreate
-from db.models import User, hash_password
-from db.database import get_db
-from core.auth import get_current_user
+from db.models import User
+from db.database import DbSession, get_db, run_db
+from db.deletes import purge_user
+from core.auth import get_current_user, Principal, principal_cache
+from core.hashing import password_hasher
 
 
 router = APIRouter(tags=["User"])
 
-@router.post("/register", response_model=UserResponse)
-def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user_data.username).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    hashed_password = hash_password(user_data.password)
-    new_user =User(username=user_data.username, hashed_password=hashed_password)
+# Route bodies are sync helpers run through run_db, on the threadpool or on an
+# AsyncSession depending on DATABASE_ASYNC; bcrypt is awaited outside them.
+
+def _username_taken(db: Session, username: str) -> bool:
+    return db.query(User).filter(User.username == username).first() is not None
+
+def _add_user(db: Session, username: str, hashed_password: str) -> User:
+    new_user = User(username=username, hashed_password=hashed_password)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
     return new_user
 
-@router.get("/users", response_model=UserResponse)
-def get_user(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    db_user = db.query(User).filter(User.id == user.id).first()
-    if db_user is None: 
+def _get_user(db: Session, user_id: int) -> User:
+    db_user = db.query(User).filter(User.id == user_id).first()
+    if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     return db_user
 
-@router.put("/users", response_model=UserResponse)
-def update_user(updated_data: UserCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-   
-    db_user = db.query(User).filter(User.id == user.id).first()
-    if not db_user: 
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    if updated_data.username:
-        db_user.username = updated_data.username
-    if updated_data.password:
-        db_user.hashed_password = hash_password(updated_data.password)
-   
+def _update_user(db: Session, user_id: int, username: Optional[str], hashed_password: Optional[str]) -> User:
+    db_user = _get_user(db, user_id)
+    if username:
+        db_user.username = username
+    if hashed_password:
+        db_user.hashed_password = hashed_password
+        # A new password revokes every token issued for the old one
+        db_user.token_version = User.token_version + 1
     db.commit()
     db.refresh(db_user)
-    
     return db_user
 
+def _close_account(db: Session, user_id: int):
+    db_user = _get_user(db, user_id)
+    db_user.deleted_at = func.now()
+    db_user.token_version = User.token_version + 1
+    db.commit()
 
-@router.delete("/users", response_model=UserResponse)
-def delete_user(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
 
-    db_user = db.query(User).filter(User.id == user.id).first()
-    if db_user is None:
+@router.post("/register", response_model=UserResponse)
+async def create_user(user_data: UserCreate, db: DbSession = Depends(get_db)):
+    if await run_db(db, _username_taken, user_data.username):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
         )
-    db.delete(db_user)
-    db.commit()
+    hashed_password = await password_hasher.ahash(user_data.password)
+    return await run_db(db, _add_user, user_data.username, hashed_password)
+
+@router.get("/users", response_model=UserResponse)
+async def get_user(db: DbSession = Depends(get_db), user: Principal = Depends(get_current_user)):
+    return await run_db(db, _get_user, user.id)
+
+@router.put("/users", response_model=UserResponse)
+async def update_user(updated_data: UserCreate, db: DbSession = Depends(get_db), user: Principal = Depends(get_current_user)):
+    hashed_password = None
+    if updated_data.password:
+        hashed_password = await password_hasher.ahash(updated_data.password)
+    db_user = await run_db(db, _update_user, user.id, updated_data.username, hashed_password)
+    principal_cache.invalidate(user.id)
+
+    return db_user
+
+
+@router.delete("/users", status_code=status.HTTP_202_ACCEPTED)
+async def delete_user(background_tasks: BackgroundTasks, db: DbSession = Depends(get_db), user: Principal = Depends(get_current_user)):
+    """Close the account now and purge its diary in the background"""
+    await run_db(db, _close_account, user.id)
+    principal_cache.invalidate(user.id)
+    background_tasks.add_task(purge_user, user.id)
 
-    return {"detail": "User deleted successfully"}
\ No newline at end of file
+    return {"detail": "User deletion scheduled"}
@@ -0,0 +1,121 @@
+"""Storage and bandwidth saved by entry compression.
+
+Seeds a throwaway SQLite database with a prose-like corpus through the API's
+own bulk insert, then reports how many bytes entry content takes as text and
+as stored, and how large list pages and single entries are on the wire with
+and without ``Accept-Encoding: gzip``.
+
+    python -m benchmarks.compression --entries 2000 --words 150 400 1000
+
+With BENCH_DATABASE_URL set to an empty PostgreSQL database, the stored
+size is what TOAST made of the content, as pg_column_size() reports it.
+"""
+import argparse
+import json
+import random
+
+from benchmarks.scratch import register, use_scratch_database
+
+use_scratch_database("compression")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import LargeBinary, cast, func, select
+
+from core.config import settings
+from db.bulk import insert_entries
+from db.database import Sessionlocal
+from db.deletes import delete_entries
+from db.migrations import upgrade_to_head
+from db.dialect import plain_text
+from db.models import DiaryEntry
+from main import app
+from schemas.diary import DiaryEntryCreate
+
+WORDS = (
+    "i we the a of to and in it was today morning evening walked talked felt quiet long "
+    "coffee friends family work rain sun river book music tired happy calm thought about "
+    "after before with without again finally really little while home city train slow"
+).split()
+
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 18))
+    return " ".join(words).capitalize() + "."
+
+
+def prose(rng: random.Random, words: int) -> str:
+    sentences = []
+    while sum(len(s.split()) for s in sentences) < words:
+        sentences.append(sentence(rng))
+    return " ".join(sentences)
+
+
+def measure(client: TestClient, headers: dict, user_id: int, entries: int, words: int, rng: random.Random) -> dict:
+    with Sessionlocal() as db:
+        delete_entries(db, user_id)
+        db.commit()
+        batch = [
+            DiaryEntryCreate(title=sentence(rng), content=prose(rng, words), mood="calm", tags=[], gratitude_items=[])
+            for _ in range(entries)
+        ]
+        insert_entries(db, user_id, batch, {})
+        if db.get_bind().dialect.name == "postgresql":
+            sizes = (
+                func.sum(func.octet_length(DiaryEntry.content)),
+                func.sum(func.pg_column_size(DiaryEntry.content)),
+                func.count().filter(func.pg_column_compression(DiaryEntry.content).is_not(None)),
+            )
+        else:
+            sizes = (
+                func.sum(func.length(cast(plain_text(DiaryEntry.content), LargeBinary))),
+                func.sum(func.length(cast(DiaryEntry.content, LargeBinary))),
+                func.count().filter(func.typeof(DiaryEntry.content) == "blob"),
+            )
+        text_bytes, stored_bytes, compressed_rows = db.execute(
+            select(*sizes).where(DiaryEntry.user_id == user_id)
+        ).one()
+
+    def wire_bytes(url: str, **params) -> dict:
+        sizes = {}
+        for encoding in ("identity", "gzip"):
+            response = client.get(url, params=params, headers={**headers, "Accept-Encoding": encoding})
+            response.raise_for_status()
+            # httpx decodes the body, so the header is what actually crossed the wire
+            sizes[encoding] = int(response.headers["content-length"])
+        return {**sizes, "ratio": round(sizes["identity"] / sizes["gzip"], 2)}
+
+    first_id = client.get("/api/entries", params={"limit": 1}, headers=headers).json()[0]["id"]
+    return {
+        "words_per_entry": words,
+        "entries": entries,
+        "content_text_bytes": text_bytes,
+        "content_stored_bytes": stored_bytes,
+        "compressed_rows": compressed_rows,
+        "storage_ratio": round(text_bytes / stored_bytes, 2),
+        "list_page_100": wire_bytes("/api/entries", limit=100),
+        "single_entry": wire_bytes(f"/api/entries/{first_id}"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--words", type=int, nargs="+", default=[150, 400, 1000])
+    parser.add_argument("--seed", type=int, default=22)
+    args = parser.parse_args()
+
+    upgrade_to_head()
+    rng = random.Random(args.seed)
+    with TestClient(app) as client:
+        user_id, headers = register(client)
+        results = [measure(client, headers, user_id, args.entries, words, rng) for words in args.words]
+    print(json.dumps({
+        "database": settings.database_url.split("://")[0],
+        "content_compression_min_bytes": settings.content_compression_min_bytes,
+        "response_gzip_min_bytes": settings.response_gzip_min_bytes,
+        "runs": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Load test for the Digital Diary API.
+
+Boots ``main.app`` under uvicorn against a local database, seeds it, then
+drives a weighted mix of requests from concurrent clients for a fixed time at
+each concurrency level. Prints (and optionally writes) a JSON report with
+throughput, p50/p95/p99 latency and SQL queries per request for every
+operation, so runs can be compared over time.
+
+    python -m benchmarks.load --concurrency 10 50 --duration 20 --output run.json
+    python -m benchmarks.load --compare baseline.json --max-regression 0.25
+
+``--database-url`` defaults to a throwaway SQLite file; point it at a local
+PostgreSQL database (with DATABASE_SSLMODE=disable) to benchmark that instead.
+``--database-async`` serves the run from AsyncSessions (DATABASE_ASYNC=1);
+run the same levels with and without it to compare the two stacks:
+
+    python -m benchmarks.load --concurrency 50 200 1000 --output sync.json
+    python -m benchmarks.load --concurrency 50 200 1000 --database-async --output async.json
+
+``--compare`` exits non-zero when any operation's p95 regressed by more than
+``--max-regression`` against a previous report, for use in CI.
+
+Requires the packages in benchmarks/requirements.txt.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+DEFAULT_MIX = "token=5,create=15,list_shallow=35,list_deep_offset=10,list_deep_cursor=10,update=15,delete=10"
+PASSWORD = "benchmark-password"
+PAGE_SIZE = 20
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+def configure_environment(args) -> str:
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    if args.database_async:
+        os.environ["DATABASE_ASYNC"] = "1"
+    # A few seeded users generate far more traffic each than any real client
+    os.environ["ADMISSION_ENABLED"] = "1" if args.admission else "0"
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    return database_url
+
+
+def seed(args) -> Dict[str, dict]:
+    """Create users and their diaries; returns per-username seed info"""
+    from sqlalchemy import select
+    from db.bulk import insert_entries
+    from db.database import Sessionlocal
+    from db.models import DiaryEntry, User
+    from core.config import settings
+    from core.hashing import password_context
+    from core.pagination import encode_cursor
+    from schemas.diary import DiaryEntryCreate
+
+    rng = random.Random(args.seed)
+    hashed = password_context(settings.bcrypt_rounds).hash(PASSWORD)
+    tag_names = [f"tag{i}" for i in range(args.tags)]
+    words = "morning walk coffee work friends family rain sun book music tired happy quiet long day".split()
+    moods = ["happy", "neutral", "sad", "excited", "calm", None]
+
+    users = {}
+    with Sessionlocal() as db:
+        tag_ids = {}
+        for n in range(args.users):
+            user = User(username=f"bench{n}", hashed_password=hashed)
+            db.add(user)
+            db.commit()
+            for start in range(0, args.entries_per_user, 1000):
+                batch = [
+                    DiaryEntryCreate(
+                        title=" ".join(rng.choices(words, k=4)),
+                        content=" ".join(rng.choices(words, k=args.content_words)),
+                        mood=rng.choice(moods),
+                        tags=rng.sample(tag_names, k=min(len(tag_names), 3)),
+                        gratitude_items=[" ".join(rng.choices(words, k=5)) for _ in range(args.gratitude_per_entry)],
+                    )
+                    for _ in range(min(1000, args.entries_per_user - start))
+                ]
+                insert_entries(db, user.id, batch, tag_ids)
+            entries = db.execute(
+                select(DiaryEntry.id, DiaryEntry.created_at)
+                .where(DiaryEntry.user_id == user.id)
+                .order_by(DiaryEntry.created_at.desc(), DiaryEntry.id.desc())
+            ).all()
+            deep = max(0, len(entries) - PAGE_SIZE - 1)
+            users[user.username] = {
+                "entry_ids": [entry_id for entry_id, _ in entries],
+                "deep_offset": deep,
+                "deep_cursor": encode_cursor(entries[deep][1], entries[deep][0]) if entries else None,
+            }
+    return users
+
+
+class Server:
+    """uvicorn running main.app in a background thread"""
+    def __init__(self):
+        import uvicorn
+        from main import app
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def entry_payload(rng: random.Random) -> dict:
+    return {
+        "title": f"load test {rng.randint(0, 10**6)}",
+        "content": "written by the load generator " * rng.randint(1, 20),
+        "mood": rng.choice(["happy", "calm", "sad"]),
+        "tags": [f"tag{rng.randint(0, 9)}", "load"],
+        "gratitude_items": ["coffee"],
+    }
+
+
+async def client_loop(http, username: str, info: dict, mix: Dict[str, int], deadline: float, rng: random.Random, results):
+    import httpx
+
+    async def timed(op: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await http.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            results[op]["errors"] += 1
+            return None
+        results[op]["latencies"].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            results[op]["errors"] += 1
+            results[op]["statuses"][response.status_code] += 1
+        queries = response.headers.get("x-query-count")
+        if queries is not None:
+            results[op]["queries"].append(int(queries))
+        return response
+
+    async def login():
+        # A burst of logins overflows the bcrypt queue; shed clients retry
+        # rather than spend the run collecting 401s
+        while time.perf_counter() < deadline:
+            response = await timed("token", "POST", "/token", data={"username": username, "password": PASSWORD})
+            if response is not None and response.status_code == 200:
+                http.headers["Authorization"] = "Bearer " + response.json()["access_token"]
+                return
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            await asyncio.sleep(float(retry_after or 1) * rng.uniform(0.5, 1.5))
+
+    await login()
+    created: List[int] = []
+    ops, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        if op == "delete" and not created:
+            op = "create"
+        if op == "token":
+            await login()
+        elif op == "create":
+            response = await timed(op, "POST", "/api/entries", json=entry_payload(rng))
+            if response is not None and response.status_code == 201:
+                created.append(response.json()["id"])
+        elif op == "list_shallow":
+            await timed(op, "GET", "/api/entries", params={"limit": PAGE_SIZE})
+        elif op == "list_deep_offset":
+            await timed(op, "GET", "/api/entries", params={"limit": PAGE_SIZE, "skip": info["deep_offset"]})
+        elif op == "list_deep_cursor" and info["deep_cursor"]:
+            await timed(op, "GET", "/api/entries", params={"limit": PAGE_SIZE, "cursor": info["deep_cursor"]})
+        elif op == "update" and info["entry_ids"]:
+            entry_id = rng.choice(info["entry_ids"])
+            await timed(op, "PUT", f"/api/entries/{entry_id}", json=entry_payload(rng))
+        elif op == "delete":
+            await timed(op, "DELETE", f"/api/entries/{created.pop()}")
+
+
+async def run_level(base_url: str, users: Dict[str, dict], mix: Dict[str, int], concurrency: int, duration: float, seed: int) -> dict:
+    import httpx
+
+    results = defaultdict(lambda: {"latencies": [], "queries": [], "errors": 0, "statuses": defaultdict(int)})
+    usernames = sorted(users)
+    # One connection per virtual client: each one issues requests sequentially
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    clients = [httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) for _ in range(concurrency)]
+    # Building a client is slow enough that a thousand of them would eat the run
+    started = time.perf_counter()
+    deadline = started + duration
+    try:
+        await asyncio.gather(*(
+            client_loop(client, usernames[n % len(usernames)], users[usernames[n % len(usernames)]],
+                        mix, deadline, random.Random(seed + n), results)
+            for n, client in enumerate(clients)
+        ))
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+    elapsed = time.perf_counter() - started
+
+    operations = {}
+    for op, data in sorted(results.items()):
+        latencies = data["latencies"]
+        operations[op] = {
+            "requests": len(latencies),
+            "errors": data["errors"],
+            "error_statuses": {str(code): count for code, count in sorted(data["statuses"].items())},
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "queries_per_request": round(sum(data["queries"]) / len(data["queries"]), 2) if data["queries"] else None,
+        }
+    all_latencies = [latency for data in results.values() for latency in data["latencies"]]
+    return {
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(all_latencies) / elapsed, 2),
+        "p50_ms": round(percentile(all_latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(all_latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(all_latencies, 99) * 1000, 2),
+        "operations": operations,
+    }
+
+
+def find_regressions(report: dict, baseline: dict, max_regression: float) -> List[str]:
+    """p95 regressions beyond the allowed ratio, per concurrency level and operation"""
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = []
+    for level in report["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before:
+            continue
+        for op, stats in level["operations"].items():
+            old = before["operations"].get(op)
+            if old and old["p95_ms"] and stats["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+                regressions.append(
+                    f"c={level['concurrency']} {op}: p95 {old['p95_ms']}ms -> {stats['p95_ms']}ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--entries-per-user", type=int, default=1000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--gratitude-per-entry", type=int, default=2)
+    parser.add_argument("--content-words", type=int, default=150)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma-separated op=weight pairs")
+    parser.add_argument("--database-async", action="store_true", help="serve requests from AsyncSessions")
+    parser.add_argument("--admission", action="store_true", help="keep per-user rate limits and load shedding on")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS for the run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to check for p95 regressions")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    database_url = configure_environment(args)
+    mix = parse_mix(args.mix)
+
+    with Server() as base_url:
+        from core.config import settings
+        from db.database import configure_engine
+        from db.migrations import upgrade_to_head
+        upgrade_to_head()
+        configure_engine(settings)
+        users = seed(args)
+        levels = [
+            asyncio.run(run_level(base_url, users, mix, concurrency, args.duration, args.seed))
+            for concurrency in args.concurrency
+        ]
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "database": database_url.split("://")[0],
+        "database_async": args.database_async,
+        "seed": {
+            "users": args.users,
+            "entries_per_user": args.entries_per_user,
+            "tags": args.tags,
+            "gratitude_per_entry": args.gratitude_per_entry,
+        },
+        "mix": mix,
+        "levels": levels,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = find_regressions(report, json.load(f), args.max_regression)
+        for line in regressions:
+            print("REGRESSION", line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Setup shared by the benchmark scripts.
+
+Call use_scratch_database() before importing anything from the app: settings
+are read from the environment at import time.
+"""
+import os
+import tempfile
+from typing import Tuple
+
+
+def use_scratch_database(name: str) -> str:
+    """Point the app at a throwaway SQLite file, or at BENCH_DATABASE_URL
+    (an empty PostgreSQL database, say) when that is set; returns its URL"""
+    url = os.environ.get("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DATABASE_SSLMODE", "disable")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    # Scripts send bursts far above any real client's rate
+    os.environ["ADMISSION_ENABLED"] = "0"
+    return url
+
+
+def register(client, username: str = "bench", password: str = "bench") -> Tuple[int, dict]:
+    """Register and log in a user: (id, headers carrying their access token)"""
+    user_id = client.post("/api/register", json={"username": username, "password": password}).json()["id"]
+    token = client.post("/token", data={"username": username, "password": password}).json()["access_token"]
+    return user_id, {"Authorization": f"Bearer {token}"}
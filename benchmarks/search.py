@@ -0,0 +1,86 @@
+"""Full-text search benchmark.
+
+Seeds a throwaway SQLite database with growing numbers of entries and times
+``db.search.search_entries`` against a ``LIKE`` scan for the same term. The
+term appears in a fixed number of entries at every size, so indexed search
+time should stay roughly flat while the scan grows linearly.
+
+    python -m benchmarks.search --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import Session
+
+from db.compression import register_sqlite_functions
+from db.dialect import plain_text
+from db.migrations import upgrade_to_head
+from db.models import User, DiaryEntry
+from db.search import search_entries
+
+NEEDLE = "zephyrine"
+NEEDLE_HITS = 10
+
+
+def _words(rng: random.Random, vocabulary, n: int) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(n))
+
+
+def seed(session: Session, size: int, rng: random.Random):
+    vocabulary = ["".join(rng.choice("abcdefghijklmnoprstuvw") for _ in range(rng.randint(3, 9))) for _ in range(5000)]
+    session.execute(insert(User), [{"id": 1, "username": "bench", "hashed_password": "x"}])
+    needles = set(rng.sample(range(size), NEEDLE_HITS))
+    rows = []
+    for i in range(size):
+        content = _words(rng, vocabulary, 120)
+        if i in needles:
+            content += " " + NEEDLE
+        rows.append({"user_id": 1, "title": _words(rng, vocabulary, 4), "content": content})
+        if len(rows) == 5000:
+            session.execute(insert(DiaryEntry), rows)
+            rows = []
+    if rows:
+        session.execute(insert(DiaryEntry), rows)
+    session.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def run(size: int, repeat: int) -> dict:
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "search.db")
+    upgrade_to_head(url)
+    engine = create_engine(url)
+    event.listen(engine, "connect", register_sqlite_functions)
+    with Session(engine) as session:
+        seed(session, size, random.Random(size))
+        fts_ms = timed(lambda: search_entries(session, 1, NEEDLE, 20), repeat)
+        scan = select(DiaryEntry.id).where(DiaryEntry.user_id == 1, plain_text(DiaryEntry.content).contains(NEEDLE)).limit(20)
+        scan_ms = timed(lambda: session.execute(scan).all(), repeat)
+        hits = len(search_entries(session, 1, NEEDLE, 20))
+    engine.dispose()
+    return {"entries": size, "hits": hits, "fts_ms": round(fts_ms, 3), "like_scan_ms": round(scan_ms, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps([run(size, args.repeat) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
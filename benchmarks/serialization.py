@@ -0,0 +1,121 @@
+"""Microbenchmark of the entry serialization fast path.
+
+Seeds a throwaway SQLite database, then times the response model chain (ORM
+objects, ``from_attributes`` validation into DiaryEntryResponse,
+jsonable_encoder, JSONResponse) against Core rows encoded by orjson, on
+pages of ``--page-size`` entries: from the query through to the encoded
+body, and the encoding step alone. tests/test_serialization.py checks that
+both produce the same bytes.
+
+    python -m benchmarks.serialization --entries 2000 --page-size 100
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.scratch import register, use_scratch_database
+
+use_scratch_database("serialization")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from typing import List
+
+from api.diary import entry_relations
+from core.fast_json import dumps
+from db.bulk import insert_entries
+from db.database import Sessionlocal
+from db.entry_rows import ENTRY_COLUMNS, entry_payloads
+from db.migrations import upgrade_to_head
+from db.models import DiaryEntry, MoodEnum
+from main import app
+from schemas.diary import DiaryEntryCreate, DiaryEntryResponse
+
+response_list = TypeAdapter(List[DiaryEntryResponse])
+
+WORDS = "rain coffee river walk quiet friends book train home tired calm long".split()
+
+
+def reference_body(entries: List[DiaryEntry]) -> bytes:
+    model = response_list.validate_python(entries, from_attributes=True)
+    return JSONResponse(jsonable_encoder(model)).body
+
+
+def seed(user_id: int, entries: int, rng: random.Random):
+    with Sessionlocal() as db:
+        insert_entries(db, user_id, [
+            DiaryEntryCreate(
+                title=" ".join(rng.choices(WORDS, k=4)),
+                content=" ".join(rng.choices(WORDS, k=rng.choice([5, 200, 800]))),
+                mood=rng.choice([None, *MoodEnum]),
+                tags=rng.sample(WORDS, k=rng.randint(0, 5)),
+                gratitude_items=rng.choices(WORDS, k=rng.randint(0, 4)),
+            )
+            for _ in range(entries)
+        ], {})
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+
+def benchmark(user_id: int, page_size: int, repeat: int) -> dict:
+    newest_first = (DiaryEntry.created_at.desc(), DiaryEntry.id.desc())
+    with Sessionlocal() as db:
+        def load_entries():
+            db.expunge_all()
+            return db.scalars(
+                select(DiaryEntry).options(*entry_relations)
+                .where(DiaryEntry.user_id == user_id).order_by(*newest_first).limit(page_size)
+            ).all()
+
+        def load_payloads():
+            rows = db.execute(
+                select(*ENTRY_COLUMNS).where(DiaryEntry.user_id == user_id).order_by(*newest_first).limit(page_size)
+            ).all()
+            return entry_payloads(db, rows)
+
+        entries, payloads = load_entries(), load_payloads()
+        results = {
+            "query_to_body": {
+                "orm_pydantic": timed(lambda: reference_body(load_entries()), repeat),
+                "core_orjson": timed(lambda: dumps(load_payloads()), repeat),
+            },
+            "encode_only": {
+                "orm_pydantic": timed(lambda: reference_body(entries), repeat),
+                "core_orjson": timed(lambda: dumps(payloads), repeat),
+            },
+        }
+    for stage in results.values():
+        stage["speedup"] = round(stage["orm_pydantic"]["median_ms"] / stage["core_orjson"]["median_ms"], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=25)
+    args = parser.parse_args()
+
+    upgrade_to_head()
+    with TestClient(app) as client:
+        user_id, _ = register(client)
+        seed(user_id, args.entries, random.Random(args.seed))
+        results = benchmark(user_id, args.page_size, args.repeat)
+    print(json.dumps({"entries": args.entries, "page_size": args.page_size, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
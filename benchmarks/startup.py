@@ -0,0 +1,58 @@
+"""Worker startup benchmark.
+
+Times what a fresh uvicorn worker pays before it can serve: ``import main``
+and the lifespan startup, each in a clean subprocess. ``DATABASE_URL`` points
+at an unroutable PostgreSQL address by default, so a run that completes
+quickly shows that booting never opens a database connection.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+UNREACHABLE_URL = "postgresql://diary@203.0.113.1:5432/diary"
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"import_ms": (imported - started) * 1000, "lifespan_ms": (ready - imported) * 1000}))
+"""
+
+
+def run_once(database_url: str, timeout: float) -> dict:
+    env = {**os.environ, "DATABASE_URL": database_url, "SECRET_KEY": os.environ.get("SECRET_KEY", "bench")}
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, timeout=timeout, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", default=UNREACHABLE_URL)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-run limit; a hang means startup hit the database")
+    args = parser.parse_args()
+
+    samples = [run_once(args.database_url, args.timeout) for _ in range(args.runs)]
+    summary = {"runs": args.runs, "database_url": args.database_url}
+    for key in ("import_ms", "lifespan_ms"):
+        values = sorted(sample[key] for sample in samples)
+        summary[key] = {"median": round(statistics.median(values), 2), "max": round(values[-1], 2)}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
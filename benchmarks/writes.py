@@ -0,0 +1,71 @@
+"""Write amplification of entry edits.
+
+Counts the INSERT/UPDATE/DELETE statements each kind of edit issues against
+a throwaway SQLite database, for PUT (full replacement) and PATCH (partial
+update). tests/test_patch_writes.py asserts the PATCH side.
+
+    python -m benchmarks.writes
+"""
+import json
+
+from benchmarks.scratch import register, use_scratch_database
+
+use_scratch_database("writes")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from core.config import settings
+from db.database import configure_engine
+from db.migrations import upgrade_to_head
+from main import app
+
+ENTRY = {
+    "title": "Monday",
+    "content": "Long walk by the river. " * 40,
+    "mood": "calm",
+    "tags": ["walk", "river", "outdoors", "monday"],
+    "gratitude_items": ["sunshine", "coffee", "a quiet morning"],
+}
+
+EDITS = [
+    ("title only", {"title": "Monday, again"}),
+    ("mood only", {"mood": "happy"}),
+    ("one tag swapped", {"tags": ["walk", "river", "outdoors", "tuesday"]}),
+    ("one gratitude item added", {"gratitude_items": ["sunshine", "coffee", "a quiet morning", "friends"]}),
+    ("no change", {}),
+]
+
+
+def main():
+    upgrade_to_head()
+    engine = configure_engine(settings)
+    writes = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0] in ("INSERT", "UPDATE", "DELETE"):
+            writes.append(" ".join(statement.split()[:3]))
+
+    results = []
+    with TestClient(app) as client:
+        _, headers = register(client)
+        for name, patch in EDITS:
+            counts = {}
+            for method in ("PUT", "PATCH"):
+                entry_id = client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+                writes.clear()
+                body = {**ENTRY, **patch} if method == "PUT" else patch
+                client.request(method, f"/api/entries/{entry_id}", json=body, headers=headers).raise_for_status()
+                counts[method.lower()] = list(writes)
+            results.append({
+                "edit": name,
+                "put_writes": len(counts["put"]),
+                "patch_writes": len(counts["patch"]),
+                "patch_statements": counts["patch"],
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
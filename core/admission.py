@@ -0,0 +1,310 @@
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from jose import jwt, JWTError
+import asyncio
+import json
+import math
+import threading
+import time
+import weakref
+
+from core.auth import SECRET_KEY, ALGORITHM
+from core.config import Settings
+from core.metrics import Sampled, registry
+
+
+# Routes that cost far more than a normal request: bcrypt, or thousands of rows.
+# Each gets its own bucket per caller, on top of the caller's general budget.
+EXPENSIVE_ROUTES = {
+    ("POST", "/token"): "login",
+    ("POST", "/api/register"): "register",
+    ("POST", "/api/entries/bulk"): "bulk",
+}
+EXEMPT_PATHS = {"/metrics"}
+
+# (tokens left, time they were counted at)
+BucketState = Tuple[float, float]
+# (key, rate, burst) of a bucket a request spends from
+Bucket = Tuple[str, float, float]
+
+# Every limiter and refusal in the process, for /metrics
+_limiters: "weakref.WeakSet[ConcurrencyLimiter]" = weakref.WeakSet()
+rejections = Counter()
+
+registry.register(Sampled(
+    "admission_in_flight", "Requests admitted and not yet finished", "gauge",
+    lambda: sum(limiter.in_flight for limiter in _limiters)
+))
+registry.register(Sampled(
+    "admission_queued", "Requests waiting for an in-flight slot", "gauge",
+    lambda: sum(limiter.queued for limiter in _limiters)
+))
+registry.register(Sampled(
+    "admission_rate_limited_total", "Requests refused with 429 by a token bucket", "counter",
+    lambda: rejections["rate_limited"]
+))
+registry.register(Sampled(
+    "admission_shed_total", "Requests shed with 503 by the in-flight cap", "counter",
+    lambda: rejections["shed"]
+))
+
+
+def _spend(state: Optional[BucketState], now: float, rate: float, burst: float, cost: float) -> Tuple[BucketState, float]:
+    """Refill a bucket up to ``now`` and try to spend ``cost``; returns the new state and the wait, 0 if admitted"""
+    tokens = burst if state is None else min(burst, state[0] + (now - state[1]) * rate)
+    if tokens >= cost:
+        return (tokens - cost, now), 0.0
+    return (tokens, now), (cost - tokens) / rate
+
+
+class BucketBackend(ABC):
+    """Where token bucket state lives"""
+    @abstractmethod
+    async def take(self, buckets: Sequence[Bucket], cost: float = 1.0) -> float:
+        """Spend ``cost`` tokens from every bucket, or from none of them.
+
+        Returns 0 if all of them admitted the request, else the seconds until
+        they all would; a refused request leaves every bucket as it found it.
+        """
+
+
+class InProcessBuckets(BucketBackend):
+    """Buckets in this worker's memory; the least recently used are dropped past ``maxsize``"""
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, BucketState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, buckets: Sequence[Bucket], cost: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            spent = [(key, *_spend(self._buckets.get(key), now, rate, burst, cost)) for key, rate, burst in buckets]
+            wait = max((wait for _, _, wait in spent), default=0.0)
+            if wait:
+                return wait
+            for key, state, _ in spent:
+                self._buckets[key] = state
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+
+class KeyValueStore(ABC):
+    """The two operations a shared store (Redis, memcached...) must offer for StoreBuckets"""
+    @abstractmethod
+    async def get(self, key: str) -> Optional[BucketState]:
+        """The state stored under ``key``, None if there is none"""
+
+    @abstractmethod
+    async def compare_and_set(self, key: str, expected: Optional[BucketState], value: BucketState) -> bool:
+        """Store ``value`` only if ``key`` still holds ``expected``"""
+
+
+class LocalKeyValueStore(KeyValueStore):
+    """In-memory stand-in for a shared store.
+
+    Several apps given the same instance behave like workers sharing one
+    store. ``latency`` adds a delay to every call, like a network round trip,
+    so races between workers actually interleave.
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._data: Dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    async def _round_trip(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get(self, key: str) -> Optional[BucketState]:
+        await self._round_trip()
+        with self._lock:
+            return self._data.get(key)
+
+    async def compare_and_set(self, key: str, expected: Optional[BucketState], value: BucketState) -> bool:
+        await self._round_trip()
+        with self._lock:
+            if self._data.get(key) != expected:
+                return False
+            self._data[key] = value
+            return True
+
+
+class StoreBuckets(BucketBackend):
+    """Buckets in a KeyValueStore shared by every worker, updated optimistically.
+
+    Every bucket is read and checked before any is written. A compare-and-set
+    lost part way through hands back what was already spent and starts over,
+    unless another worker touched that bucket in between. A hot key refuses
+    requests once its compare-and-set keeps losing; a production store should
+    do the refill and spend server side instead.
+    """
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, store: KeyValueStore):
+        self.store = store
+
+    async def take(self, buckets: Sequence[Bucket], cost: float = 1.0) -> float:
+        for _ in range(self.MAX_ATTEMPTS):
+            # Wall-clock time: monotonic clocks are not comparable across hosts
+            now = time.time()
+            current = [await self.store.get(key) for key, _, _ in buckets]
+            spent = [_spend(state, now, rate, burst, cost) for state, (_, rate, burst) in zip(current, buckets)]
+            wait = max((wait for _, wait in spent), default=0.0)
+            if wait:
+                return wait
+            written = []
+            for (key, _, burst), before, (after, _) in zip(buckets, current, spent):
+                if not await self.store.compare_and_set(key, before, after):
+                    break
+                # A full bucket counted now stands in for one never stored
+                written.append((key, after, before or (burst, now)))
+            else:
+                return 0.0
+            for key, after, before in reversed(written):
+                await self.store.compare_and_set(key, after, before)
+        # Too contended to tell; refuse rather than let a hot key through unmetered
+        return max(1.0 / rate for _, rate, _ in buckets)
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests in flight; up to ``max_queue`` more wait up to ``timeout`` for a slot"""
+    def __init__(self, limit: int, max_queue: int, timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        _limiters.add(self)
+
+    async def acquire(self) -> bool:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.limit)
+        if not self._slots.locked():
+            await self._slots.acquire()
+        elif self.queued >= self.max_queue:
+            return False
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.queued -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def client_ip(scope, trusted_proxies: int = 0) -> Optional[str]:
+    """The caller's address: the peer, or with ``trusted_proxies`` in front of
+    the app, the X-Forwarded-For entry the outermost of them appended"""
+    if trusted_proxies:
+        # Each proxy appends the address it got the request from; entries to
+        # the left of the ones our proxies wrote are whatever the client sent
+        forwarded = [
+            address.strip()
+            for key, value in scope.get("headers", ()) if key == b"x-forwarded-for"
+            for address in value.decode("latin-1").split(",")
+        ]
+        if len(forwarded) >= trusted_proxies:
+            return forwarded[-trusted_proxies]
+    client = scope.get("client")
+    return client[0] if client else None
+
+def token_subject(scope) -> Optional[str]:
+    """``sub`` of a valid bearer token on the request, if there is one"""
+    authorization = _header(scope, b"authorization")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        # Verified, so nobody can spend another user's budget by forging a sub
+        return jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+class AdmissionMiddleware:
+    """Rate limits and load shedding, decided before a request reaches the routers.
+
+    A request with a valid access token spends a token from its user's
+    bucket; with ``admission_ip_enabled`` every request also spends from its
+    client IP's. Login, registration and bulk import also spend from a smaller
+    per-caller bucket of their own, keyed on the client IP when there is no
+    user, whether or not the general per-IP buckets are on. An empty bucket
+    means a 429, and spends
+    nothing from the others. Past the in-flight cap requests wait in a bounded
+    queue, and are shed with a 503 once it is full or their wait times out.
+    Both responses carry Retry-After.
+    """
+    def __init__(self, app, settings: Settings, backend: Optional[BucketBackend] = None):
+        self.app = app
+        self.settings = settings
+        self.backend = backend or InProcessBuckets()
+        self.limiter = ConcurrencyLimiter(
+            settings.admission_max_in_flight,
+            settings.admission_max_queue,
+            settings.admission_queue_timeout,
+        )
+
+    def _buckets(self, scope) -> List[Bucket]:
+        """Every bucket this request must spend from"""
+        settings = self.settings
+        caller = "ip:" + (client_ip(scope, settings.admission_trusted_proxies) or "unknown")
+        buckets = []
+        if settings.admission_ip_enabled:
+            buckets.append((caller, settings.admission_ip_rate, settings.admission_ip_burst))
+        subject = token_subject(scope)
+        if subject is not None:
+            caller = "user:" + subject
+            buckets.append((caller, settings.admission_user_rate, settings.admission_user_burst))
+        # Login and registration are anonymous; a flood of them is limited per IP
+        expensive = EXPENSIVE_ROUTES.get((scope["method"], scope["path"]))
+        if expensive:
+            buckets.append((f"{expensive}:{caller}", settings.admission_expensive_rate, settings.admission_expensive_burst))
+        return buckets
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        buckets = self._buckets(scope)
+        wait = await self.backend.take(buckets) if buckets else 0.0
+        if wait:
+            rejections["rate_limited"] += 1
+            return await _reject(send, 429, "Too many requests", wait)
+
+        if not await self.limiter.acquire():
+            rejections["shed"] += 1
+            return await _reject(send, 503, "Server is busy, retry shortly", 1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
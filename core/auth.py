@@ -1,14 +1,20 @@
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from typing import Optional
+from dataclasses import dataclass
 from datetime import timedelta, datetime
 from jose import jwt, JWTError
 import os
 from dotenv import load_dotenv
 
-from db.database import get_db
-from db.models import User, verify_password
+from db.database import DbSession, close_session, request_read_session, run_db, run_in_session
+from db.models import User
+from core.cache import TTLCache
+from core.config import settings
+from core.hashing import password_hasher
+from core.metrics import Sampled, registry
 from schemas.user import TokenData
 
 
@@ -19,14 +25,56 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def authenticate_user(db: Session, username: str, password: str):
-    """Authenticate a user"""
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, as resolved from an access token"""
+    id: int
+    username: str
+    token_version: int
+
+
+# user id -> Principal, per process. Changing or deleting a user drops the
+# entry only in the process that did it: other workers keep accepting that
+# user's revoked tokens until their entry expires (principal_cache_ttl).
+principal_cache = TTLCache(maxsize=settings.principal_cache_size, ttl=settings.principal_cache_ttl)
+
+registry.register(Sampled(
+    "principal_cache_hits_total", "Principal lookups served from cache", "counter",
+    lambda: principal_cache.hits
+))
+registry.register(Sampled(
+    "principal_cache_misses_total", "Principal lookups that went to the database", "counter",
+    lambda: principal_cache.misses
+))
+
+def _get_user_by_username(db: Session, username: str) -> Optional[User]:
+    user = db.query(User).filter(User.username == username, User.deleted_at.is_(None)).first()
+    # Detach the loaded row and end the transaction, so the connection goes
+    # back to the pool instead of being held while bcrypt runs
+    if user is not None:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+def _store_rehash(db: Session, user: User, hashed_password: str):
+    db.execute(update(User).where(User.id == user.id).values(hashed_password=hashed_password))
+    db.commit()
+    user.hashed_password = hashed_password
+
+async def authenticate_user(db: DbSession, username: str, password: str):
+    """Authenticate a user, upgrading the stored hash if the bcrypt cost changed"""
+    user = await run_db(db, _get_user_by_username, username)
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await password_hasher.averify(password, user.hashed_password)
+    if not valid:
        raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
+    if new_hash:
+        await run_db(db, _store_rehash, user, new_hash)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -40,8 +88,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get current user from token"""
+def _load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    user = db.get(User, user_id)
+    if user is None or user.deleted_at is not None:
+        return None
+    return Principal(id=user.id, username=user.username, token_version=user.token_version)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Get current user from token, hitting the database only on a cache miss.
+
+    A revoked token is refused at once by the worker that revoked it, and by
+    the others within principal_cache_ttl seconds.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -49,14 +107,30 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+        token_data = TokenData(
+            username=payload.get("sub"),
+            user_id=payload.get("uid"),
+            token_version=payload.get("ver"),
+        )
+    except (JWTError, ValueError):
+        raise credentials_exception
+    if token_data.user_id is None or token_data.token_version is None:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+
+    principal = principal_cache.get(token_data.user_id)
+    if principal is None or principal.token_version != token_data.token_version:
+        principal = await run_in_session(_load_principal, token_data.user_id)
+        if principal is None:
+            raise credentials_exception
+        principal_cache.set(principal.id, principal)
+    if principal.token_version != token_data.token_version:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return principal
+
+async def get_read_db(user: Principal = Depends(get_current_user)):
+    """Session for read-only routes, on the replica unless the user has just written"""
+    db = request_read_session(user.id)
+    try:
+        yield db
+    finally:
+        await close_session(db)
@@ -0,0 +1,107 @@
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from typing import Optional
+import os
+
+
+load_dotenv()
+
+class Settings(BaseModel):
+    """Runtime settings; each field is read from the upper-cased environment variable"""
+    database_url: Optional[str] = None
+    # Applied to PostgreSQL connections only; "disable" for a local server
+    database_sslmode: str = "require"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30.0
+    # Seconds before a pooled connection is replaced; -1 keeps them forever
+    database_pool_recycle: int = 1800
+    # Optional replica for read-only routes; may be a second SQLite file locally.
+    # Users see their own writes only when every request from a user reaches
+    # the same worker (one worker, or sticky sessions), as the pin below is
+    # kept in that worker's memory.
+    database_read_url: Optional[str] = None
+    # How long a user's reads stay on the primary after they write, in the
+    # worker that took the write
+    read_your_writes_seconds: float = 5.0
+    # Serve requests from AsyncSessions on aiosqlite/asyncpg instead of the threadpool.
+    # Off by default: on SQLite it is slower at every concurrency benchmarks/load.py
+    # tries; measure against PostgreSQL before turning it on there.
+    database_async: bool = False
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 32
+    principal_cache_size: int = 10000
+    # Each worker caches principals for this long. A password change or
+    # account deletion evicts them only in the worker that handled it, so old
+    # tokens keep working on the other workers for up to this many seconds.
+    principal_cache_ttl: float = 60.0
+    on_this_day_cache_size: int = 10000
+    on_this_day_cache_ttl: float = 3600.0
+    # Entry content at least this long is stored compressed (SQLite only)
+    content_compression_min_bytes: int = 512
+    # Responses at least this long are gzipped for clients that accept it
+    response_gzip_min_bytes: int = 1024
+    # Per-caller token buckets (requests per second, burst) and the in-flight cap
+    admission_enabled: bool = True
+    # Per-IP buckets, off by default: behind a proxy every client has the
+    # proxy's address. Set the number of proxies that append to
+    # X-Forwarded-For in front of the app before turning them on there.
+    admission_ip_enabled: bool = False
+    admission_trusted_proxies: int = 0
+    admission_ip_rate: float = 50.0
+    admission_ip_burst: float = 100.0
+    admission_user_rate: float = 20.0
+    admission_user_burst: float = 40.0
+    # Login, registration and bulk import, each budgeted separately per caller:
+    # the user, or for anonymous callers their IP even with per-IP buckets off.
+    # Behind a proxy, set ADMISSION_TRUSTED_PROXIES or every anonymous caller
+    # shares the proxy's budget.
+    admission_expensive_rate: float = 0.2
+    admission_expensive_burst: float = 5.0
+    admission_max_in_flight: int = 64
+    admission_max_queue: int = 128
+    admission_queue_timeout: float = 2.0
+    sql_echo: bool = False
+    # Log statements slower than this many milliseconds; unset disables the log
+    slow_query_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(**{
+            name: os.environ[name.upper()]
+            for name in cls.model_fields
+            if name.upper() in os.environ
+        })
+
+
+# Read from the module-level ``settings`` below when the modules using them are
+# imported, so a Settings passed to main.create_app() cannot change them; set
+# them through the environment instead
+IMPORT_TIME_FIELDS = frozenset({
+    "bcrypt_rounds",
+    "password_hash_workers",
+    "password_hash_max_queue",
+    "principal_cache_size",
+    "principal_cache_ttl",
+    "content_compression_min_bytes",
+    "slow_query_ms",
+})
+
+# Build the engines, which db.database keeps once per process: every app in
+# a process must be created with the same values
+ENGINE_FIELDS = frozenset({
+    "database_url",
+    "database_sslmode",
+    "database_pool_size",
+    "database_max_overflow",
+    "database_pool_timeout",
+    "database_pool_recycle",
+    "database_read_url",
+    "database_async",
+    "read_your_writes_seconds",
+    "sql_echo",
+})
+
+
+settings = Settings.from_env()
@@ -0,0 +1,28 @@
+from fastapi import Request, Response, status
+import hashlib
+
+
+def make_etag(*parts) -> str:
+    """Weak validator built from version counters, not from the response body"""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def query_fingerprint(request: Request) -> str:
+    """Short stable digest of the query string, so each list view gets its own ETag"""
+    items = sorted(request.query_params.multi_items())
+    return hashlib.blake2b(repr(items).encode(), digest_size=8).hexdigest()
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison against the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == current for tag in header.split(","))
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,17 @@
+from fastapi import Response
+from typing import Any, Mapping, Optional
+import orjson
+
+
+# Pydantic writes UTC datetimes with a Z suffix; orjson would write +00:00
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain data (dicts, lists, enums, datetimes) to JSON in one call"""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def json_response(content: Any, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """A JSON response for data that is already response-shaped, skipping response_model validation"""
+    return Response(content=dumps(content), media_type="application/json", headers=headers)
@@ -0,0 +1,91 @@
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+import asyncio
+import multiprocessing
+import threading
+
+from core.config import settings
+from core.metrics import Sampled, registry
+
+
+@lru_cache
+def password_context(rounds: int) -> CryptContext:
+    """bcrypt context at the given cost; hashes at any other cost need a rehash"""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+def _hash(password: str, rounds: int) -> str:
+    return password_context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return password_context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool, off the event loop and the GIL.
+
+    At most ``workers`` hashes run at once. Once ``max_queue`` calls are running
+    or waiting, new ones are shed with a 503 instead of queueing without bound.
+    """
+    def __init__(self, rounds: int, workers: int, max_queue: int):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_queue:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many password operations in progress, retry shortly",
+                    headers={"Retry-After": "1"}
+                )
+            self.pending += 1
+            if self._executor is None:
+                # spawn, not fork: the server process is multi-threaded
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            executor = self._executor
+        try:
+            future = executor.submit(fn, *args, self.rounds)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Optional[Future]):
+        with self._lock:
+            self.pending -= 1
+
+    async def ahash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password))
+
+    async def averify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; also returns a new hash when the stored one uses another cost"""
+        return await asyncio.wrap_future(self._submit(_verify_and_update, password, hashed_password))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
+registry.register(Sampled(
+    "password_hash_pending", "Password hash operations running or queued", "gauge",
+    lambda: password_hasher.pending
+))
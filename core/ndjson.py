@@ -0,0 +1,26 @@
+from fastapi import HTTPException, status
+from typing import AsyncIterable, AsyncIterator
+
+
+MAX_LINE_BYTES = 1024 * 1024
+
+async def aiter_lines(chunks: AsyncIterable[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """Split a streamed body into lines without buffering more than one line"""
+    def checked(line: bytes) -> bytes:
+        if len(line) > max_line_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"NDJSON line exceeds {max_line_bytes} bytes"
+            )
+        return line
+
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield checked(line)
+        # A line still arriving is refused as soon as it is over the limit
+        checked(buffer)
+    if buffer:
+        yield buffer
@@ -0,0 +1,53 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from collections import Counter
+from typing import Dict, List
+
+from schemas.diary import DiaryEntryCreate
+from .models import DiaryEntry, EntryTag, GratitudeItem
+from .tags import resolve_tag_ids
+from .rollups import apply_mood_deltas, apply_tag_deltas, mood_key
+from .versions import touch_diary
+
+
+def insert_entries(db: Session, user_id: int, entries: List[DiaryEntryCreate], tag_ids: Dict[str, int]) -> List[int]:
+    """Insert a batch of entries with multi-row inserts and commit it.
+
+    ``tag_ids`` is a name -> id map shared across batches; it is extended with
+    any tags this batch creates.
+    """
+    inserted = db.execute(
+        insert(DiaryEntry).returning(DiaryEntry.id, DiaryEntry.created_at, sort_by_parameter_order=True),
+        [
+            {"user_id": user_id, "title": entry.title, "content": entry.content, "mood": entry.mood}
+            for entry in entries
+        ],
+    ).all()
+    entry_ids = [entry_id for entry_id, _ in inserted]
+
+    new_names = {name for entry in entries for name in entry.tags or []} - tag_ids.keys()
+    tag_ids.update(resolve_tag_ids(db, new_names))
+
+    links = [
+        {"entry_id": entry_id, "tag_id": tag_ids[name]}
+        for entry_id, entry in zip(entry_ids, entries)
+        for name in dict.fromkeys(entry.tags or [])
+    ]
+    if links:
+        db.execute(insert(EntryTag), links)
+        apply_tag_deltas(db, user_id, Counter(link["tag_id"] for link in links))
+
+    gratitude_items = [
+        {"entry_id": entry_id, "content": content}
+        for entry_id, entry in zip(entry_ids, entries)
+        for content in entry.gratitude_items or []
+    ]
+    if gratitude_items:
+        db.execute(insert(GratitudeItem), gratitude_items)
+
+    apply_mood_deltas(db, user_id, Counter(
+        mood_key(created_at, entry.mood) for (_, created_at), entry in zip(inserted, entries)
+    ))
+    touch_diary(db, user_id)
+    db.commit()
+    return entry_ids
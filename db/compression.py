@@ -0,0 +1,67 @@
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+from typing import Optional, Union
+import zlib
+
+
+# A compressed value is stored as bytes: this header, then a zlib stream. The
+# last header byte is the format version, so the encoding can change later
+# without rewriting rows already stored in an older one.
+MAGIC = b"DZ"
+FORMAT_VERSION = 1
+HEADER = MAGIC + bytes([FORMAT_VERSION])
+
+# SQL function that turns a stored value back into text, for triggers, views
+# and queries that need the content inside the database
+SQLITE_TEXT_FUNCTION = "diary_text"
+
+
+def compress_text(text: str, min_bytes: int) -> Union[str, bytes]:
+    """``text`` as stored: compressed when it is long enough and compression pays off"""
+    encoded = text.encode()
+    if len(encoded) < min_bytes:
+        return text
+    compressed = HEADER + zlib.compress(encoded, 6)
+    return compressed if len(compressed) < len(encoded) else text
+
+def decompress_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """The text of a stored value, whether or not it was compressed"""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value[:len(MAGIC)] != MAGIC:
+        return value.decode()
+    version = value[len(MAGIC)]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unknown compressed text format version {version}")
+    return zlib.decompress(value[len(HEADER):]).decode()
+
+
+class CompressedText(TypeDecorator):
+    """Text stored zlib-compressed above ``min_bytes`` on SQLite.
+
+    Values are read back as stored, ``str`` or compressed ``bytes``:
+    decompress_text() turns them into text when a response is serialized,
+    so rows loaded for anything else never pay for it.
+
+    PostgreSQL values pass through unchanged. Its search_vector, ts_headline
+    and previews need the plain text in the database. TOAST compresses them
+    itself, but only in rows over about 2 KB, a compile-time threshold that
+    toast_tuple_target does not lower; shorter entries stay uncompressed.
+    """
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, min_bytes: int):
+        super().__init__()
+        self.min_bytes = min_bytes
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return compress_text(value, self.min_bytes)
+
+
+def register_sqlite_functions(dbapi_connection, connection_record=None):
+    """Make compressed values readable from SQL on a SQLite connection"""
+    dbapi_connection.create_function(SQLITE_TEXT_FUNCTION, 1, decompress_text, deterministic=True)
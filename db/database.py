@@ -1,22 +1,266 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar, Union
+import asyncio
+import time
 
-load_dotenv()
+from core.cache import TTLCache
+from core.config import ENGINE_FIELDS, Settings
+from core.metrics import Sampled, record_query, record_pool_wait, registry
+from .compression import register_sqlite_functions
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+T = TypeVar("T")
 
-engine = create_engine(DATABASE_URL, echo=True, pool_pre_ping=True, connect_args={"sslmode": "require"})
+# What route dependencies yield: an AsyncSession in async mode, else a Session
+DbSession = Union[Session, AsyncSession]
 
-Sessionlocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class _TimedCheckout:
+    """Pool mixin that records how long each checkout waits for a connection"""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_wait(time.perf_counter() - started)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+# Bound by configure_engine(); nothing here touches the database at import time
+engine: Optional[Engine] = None
+read_engine: Optional[Engine] = None
+async_engine: Optional[AsyncEngine] = None
+async_read_engine: Optional[AsyncEngine] = None
+
+Sessionlocal = sessionmaker(autocommit=False, autoflush=False)
+ReadSessionlocal = sessionmaker(autocommit=False, autoflush=False)
+# Nothing may lazy load outside run_sync, so committed objects are not expired
+AsyncSessionlocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+AsyncReadSessionlocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+# Users whose latest writes may not have reached the replica yet. Only the
+# worker that took the write knows: with several workers behind a load
+# balancer, a read landing on another one can still miss the write.
+recent_writers = TTLCache(maxsize=100000, ttl=5.0)
+registry.register(Sampled(
+    "db_reads_pinned_to_primary_total", "Replica reads sent to the primary after the user's own write", "counter",
+    lambda: recent_writers.hits
+))
 
 Base = declarative_base()
 
-def get_db():
-    db = Sessionlocal()
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def _connect_args(url: Union[str, URL], settings: Settings) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return {}
+    if url.get_driver_name() == "asyncpg":
+        return {"ssl": settings.database_sslmode}
+    return {"sslmode": settings.database_sslmode}
+
+def _async_url(url: str) -> URL:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite enforces foreign keys, and so ON DELETE CASCADE, only when asked per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+def _create_engine(url: Union[str, URL], settings: Settings, factory: Callable = create_engine, poolclass=TimedQueuePool):
+    engine = factory(
+        url,
+        echo=settings.sql_echo,
+        pool_pre_ping=True,
+        poolclass=poolclass,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+        connect_args=_connect_args(url, settings)
+    )
+    if engine.dialect.name == "sqlite":
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "connect", _enable_sqlite_foreign_keys)
+        event.listen(sync_engine, "connect", register_sqlite_functions)
+    return engine
+
+def _create_async_engine(url: str, settings: Settings) -> AsyncEngine:
+    return _create_engine(_async_url(url), settings, create_async_engine, TimedAsyncQueuePool)
+
+# The ENGINE_FIELDS the current engines were built from
+_engine_settings: Optional[dict] = None
+
+def _engine_config(settings: Settings) -> dict:
+    return {name: getattr(settings, name) for name in sorted(ENGINE_FIELDS)}
+
+def check_engine_settings(settings: Settings):
+    """Raise ValueError if the engines already built in this process used other database settings"""
+    if _engine_settings is None:
+        return
+    differing = [name for name, value in _engine_config(settings).items() if _engine_settings[name] != value]
+    if differing:
+        raise ValueError(
+            f"The database engines were already configured with a different {', '.join(differing)}; "
+            "every app in a process shares them"
+        )
+
+def configure_engine(settings: Settings) -> Engine:
+    """Create the engines and bind the session factories; connections open on first use.
+
+    The sync engine always exists, for scripts and streamed exports. With
+    DATABASE_ASYNC the request dependencies hand out AsyncSessions instead.
+    Engines are built once per process; configuring them again with other
+    database settings raises ValueError rather than reusing them silently.
+    """
+    global engine, read_engine, async_engine, async_read_engine, _engine_settings
+    check_engine_settings(settings)
+    if engine is None:
+        if not settings.database_url:
+            raise RuntimeError("DATABASE_URL is not set")
+        engine = _create_engine(settings.database_url, settings)
+        if settings.database_read_url:
+            read_engine = _create_engine(settings.database_read_url, settings)
+        Sessionlocal.configure(bind=engine)
+        ReadSessionlocal.configure(bind=read_engine or engine)
+        if settings.database_async:
+            async_engine = _create_async_engine(settings.database_url, settings)
+            if settings.database_read_url:
+                async_read_engine = _create_async_engine(settings.database_read_url, settings)
+            AsyncSessionlocal.configure(bind=async_engine)
+            AsyncReadSessionlocal.configure(bind=async_read_engine or async_engine)
+        recent_writers.ttl = settings.read_your_writes_seconds
+        _engine_settings = _engine_config(settings)
+    return engine
+
+def dispose_engine():
+    global engine, read_engine, _engine_settings
+    for configured in (engine, read_engine):
+        if configured is not None:
+            configured.dispose()
+    engine = read_engine = None
+    _engine_settings = None
+
+async def dispose_async_engine():
+    global async_engine, async_read_engine
+    for configured in (async_engine, async_read_engine):
+        if configured is not None:
+            await configured.dispose()
+    async_engine = async_read_engine = None
+
+def _pinned_to_primary(user_id: int) -> bool:
+    return recent_writers.get(user_id) is not None
+
+def read_session(user_id: int) -> Session:
+    """Session on the replica, or on the primary while the user's own writes may still be replicating.
+
+    The pin is held in this process only, so read-your-writes holds for a
+    single worker, or for load balancers that keep each user on one worker.
+    Otherwise leave DATABASE_READ_URL unset.
+    """
+    if read_engine is None or _pinned_to_primary(user_id):
+        return Sessionlocal()
+    return ReadSessionlocal()
+
+def async_read_session(user_id: int) -> AsyncSession:
+    """AsyncSession counterpart of read_session"""
+    if async_read_engine is None or _pinned_to_primary(user_id):
+        return AsyncSessionlocal()
+    return AsyncReadSessionlocal()
+
+def request_read_session(user_id: int) -> DbSession:
+    """The read session a route gets: async when DATABASE_ASYNC is on"""
+    if async_engine is not None:
+        return async_read_session(user_id)
+    return read_session(user_id)
+
+# Sync sessions are closed off the shared threadpool: once every threadpool
+# thread is waiting on a pool checkout, closes queued behind them would never
+# run to hand their connections back.
+_session_closer = ThreadPoolExecutor(max_workers=4, thread_name_prefix="session-close")
+
+async def close_session(db: DbSession):
+    """Close either kind of session without blocking the event loop"""
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await asyncio.get_running_loop().run_in_executor(_session_closer, db.close)
+
+async def get_db():
+    db = AsyncSessionlocal() if async_engine is not None else Sessionlocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await close_session(db)
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args) -> T:
+    """Call ``fn(session, *args)``, a plain sync helper, against either kind of session.
+
+    A Session runs it on the threadpool. An AsyncSession runs it through
+    run_sync on the event loop, where its SQL is awaited on the async driver.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+async def run_in_session(fn: Callable[..., T], *args) -> T:
+    """run_db in a short-lived primary session of its own"""
+    if async_engine is not None:
+        async with AsyncSessionlocal() as db:
+            return await db.run_sync(fn, *args)
+
+    def call():
+        with Sessionlocal() as db:
+            return fn(db, *args)
+    return await run_in_threadpool(call)
+
+def mark_write(db: Session, user_id: int):
+    """Keep the user's reads on the primary for a while once this session commits"""
+    db.info.setdefault("writers", set()).add(user_id)
+
+
+# Listening on the Session class covers the sync sessions behind AsyncSessions too
+@event.listens_for(Session, "after_commit")
+def _pin_writers(session):
+    for user_id in session.info.pop("writers", ()):
+        recent_writers.set(user_id, True)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_writers(session):
+    session.info.pop("writers", None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    record_query(time.perf_counter() - started, statement)
+
+@event.listens_for(Engine, "handle_error")
+def _drop_query_timer(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
@@ -0,0 +1,84 @@
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from collections import Counter
+from typing import List
+
+from .database import Sessionlocal
+from .dialect import utc_date
+from .models import DiaryEntry, EntryTag, User
+from .rollups import apply_mood_deltas, apply_tag_deltas
+from .versions import touch_diary
+
+PURGE_CHUNK_SIZE = 1000
+
+
+def delete_entries(db: Session, user_id: int, *criteria) -> int:
+    """Delete the user's entries matching ``criteria`` without loading them; the caller commits.
+
+    Tag links and gratitude items go with them through ON DELETE CASCADE. The
+    mood rollup and tag counts are adjusted from grouped queries taken before
+    the delete.
+    """
+    where = (DiaryEntry.user_id == user_id, *criteria)
+    day = utc_date(DiaryEntry.created_at)
+    moods = db.execute(
+        select(day, DiaryEntry.mood, func.count())
+        .where(*where, DiaryEntry.mood.is_not(None))
+        .group_by(day, DiaryEntry.mood)
+    ).all()
+    tags = db.execute(
+        select(EntryTag.tag_id, func.count())
+        .where(EntryTag.entry_id.in_(select(DiaryEntry.id).where(*where)))
+        .group_by(EntryTag.tag_id)
+    ).all()
+
+    deleted = db.execute(
+        delete(DiaryEntry).where(*where).execution_options(synchronize_session=False)
+    ).rowcount
+    if deleted:
+        apply_mood_deltas(db, user_id, Counter({(entry_day, mood): -count for entry_day, mood, count in moods}))
+        apply_tag_deltas(db, user_id, Counter({tag_id: -count for tag_id, count in tags}))
+        touch_diary(db, user_id)
+    return deleted
+
+
+def purge_user(user_id: int, chunk_size: int = PURGE_CHUNK_SIZE):
+    """Delete a closed account's entries a chunk per transaction, then the user row.
+
+    Short transactions keep row locks brief however large the diary is.
+    Safe to run again if interrupted.
+    """
+    while True:
+        with Sessionlocal() as db:
+            chunk = select(DiaryEntry.id).where(DiaryEntry.user_id == user_id).limit(chunk_size)
+            deleted = db.execute(
+                delete(DiaryEntry)
+                .where(DiaryEntry.id.in_(chunk.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        if deleted < chunk_size:
+            break
+    with Sessionlocal() as db:
+        # Rollups and tag counts cascade from the user row
+        db.execute(delete(User).where(User.id == user_id, User.deleted_at.is_not(None)))
+        db.commit()
+
+
+def closed_accounts(db: Session) -> List[int]:
+    return db.scalars(select(User.id).where(User.deleted_at.is_not(None))).all()
+
+
+if __name__ == "__main__":
+    import argparse
+    from core.config import settings
+    from .database import configure_engine
+
+    parser = argparse.ArgumentParser(description="Finish purging closed accounts, e.g. after a restart interrupted one")
+    parser.add_argument("--chunk-size", type=int, default=PURGE_CHUNK_SIZE)
+    args = parser.parse_args()
+    configure_engine(settings)
+    with Sessionlocal() as db:
+        user_ids = closed_accounts(db)
+    for user_id in user_ids:
+        purge_user(user_id, args.chunk_size)
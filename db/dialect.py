@@ -0,0 +1,66 @@
+from sqlalchemy import Date, Integer, Text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from .compression import SQLITE_TEXT_FUNCTION
+
+
+_upsert_inserts = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def dialect_insert(db: Session, model):
+    """INSERT construct with ON CONFLICT support for the session's database"""
+    return _upsert_inserts[db.get_bind().dialect.name](model)
+
+
+class utc_date(FunctionElement):
+    """Calendar day of a timestamp, taken in UTC"""
+    type = Date()
+    name = "utc_date"
+    inherit_cache = True
+
+@compiles(utc_date)
+def _compile_utc_date(element, compiler, **kw):
+    # SQLite timestamps are stored as UTC text already
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
+@compiles(utc_date, "postgresql")
+def _compile_utc_date_postgresql(element, compiler, **kw):
+    return "date(timezone('UTC', %s))" % compiler.process(element.clauses, **kw)
+
+
+class plain_text(FunctionElement):
+    """Text of a CompressedText column, for SQL that reads it in the database"""
+    type = Text()
+    name = "plain_text"
+    inherit_cache = True
+
+@compiles(plain_text)
+def _compile_plain_text(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+@compiles(plain_text, "sqlite")
+def _compile_plain_text_sqlite(element, compiler, **kw):
+    return "%s(%s)" % (SQLITE_TEXT_FUNCTION, compiler.process(element.clauses, **kw))
+
+
+class utc_month_day(FunctionElement):
+    """Month and day of a timestamp in UTC as one integer, 1016 for 16 October"""
+    type = Integer()
+    name = "utc_month_day"
+    inherit_cache = True
+
+@compiles(utc_month_day)
+def _compile_utc_month_day(element, compiler, **kw):
+    # Not %-formatted: the SQLite driver takes the text as it is
+    return "CAST(strftime('%m%d', " + compiler.process(element.clauses, **kw) + ") AS INTEGER)"
+
+@compiles(utc_month_day, "postgresql")
+def _compile_utc_month_day_postgresql(element, compiler, **kw):
+    # Both parts are immutable, so the expression can back an index
+    utc = "timezone('UTC', %s)" % compiler.process(element.clauses, **kw)
+    return f"CAST(EXTRACT(MONTH FROM {utc}) * 100 + EXTRACT(DAY FROM {utc}) AS INTEGER)"
@@ -0,0 +1,67 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+from .compression import decompress_text
+from .models import DiaryEntry, EntryTag, GratitudeItem, Tag
+
+
+# Everything DiaryEntryResponse reads from diary_entries itself
+ENTRY_COLUMNS = (
+    DiaryEntry.id,
+    DiaryEntry.user_id,
+    DiaryEntry.created_at,
+    DiaryEntry.title,
+    DiaryEntry.content,
+    DiaryEntry.mood,
+)
+
+# Same chunking as selectinload, so neither path runs into bind parameter limits
+IN_CHUNK_SIZE = 500
+
+
+def _chunks(ids: List[int]):
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[start:start + IN_CHUNK_SIZE]
+
+
+def entry_payloads(db: Session, rows: Sequence) -> List[dict]:
+    """DiaryEntryResponse-shaped dicts for rows of ENTRY_COLUMNS, in their order.
+
+    Rows come straight from the database, so nothing is validated again and
+    no ORM objects are built. Keys follow the schema's field order and
+    related rows follow the relationships' order_by, so encoding a payload
+    gives the same bytes as serializing the response model.
+    """
+    ids = [row.id for row in rows]
+    tags: Dict[int, List[dict]] = defaultdict(list)
+    gratitude_items: Dict[int, List[dict]] = defaultdict(list)
+    for chunk in _chunks(ids):
+        for entry_id, tag_id, name in db.execute(
+            select(EntryTag.entry_id, Tag.id, Tag.name)
+            .join(Tag, Tag.id == EntryTag.tag_id)
+            .where(EntryTag.entry_id.in_(chunk))
+            .order_by(EntryTag.entry_id, Tag.id)
+        ):
+            tags[entry_id].append({"name": name, "id": tag_id})
+        for item_id, entry_id, content in db.execute(
+            select(GratitudeItem.id, GratitudeItem.entry_id, GratitudeItem.content)
+            .where(GratitudeItem.entry_id.in_(chunk))
+            .order_by(GratitudeItem.entry_id, GratitudeItem.id)
+        ):
+            gratitude_items[entry_id].append({"content": content, "id": item_id, "entry_id": entry_id})
+
+    return [
+        {
+            "title": row.title,
+            "content": decompress_text(row.content),
+            "mood": row.mood,
+            "tags": tags.get(row.id, []),
+            "gratitude_items": gratitude_items.get(row.id, []),
+            "id": row.id,
+            "user_id": row.user_id,
+            "created_at": row.created_at,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,22 @@
+from alembic import command
+from alembic.config import Config
+from typing import Optional
+import os
+
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def upgrade_to_head(database_url: Optional[str] = None):
+    """Migrate a database to the latest revision, as a deploy would.
+
+    ``database_url`` defaults to the DATABASE_URL environment variable. Scripts
+    and tests build their schema this way rather than with create_all(), so
+    they run against exactly what production gets.
+    """
+    config = Config(ALEMBIC_INI)
+    # Leave the caller's logging alone
+    config.attributes["configure_logger"] = False
+    if database_url:
+        config.attributes["database_url"] = database_url
+    command.upgrade(config, "head")
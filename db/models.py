@@ -1,12 +1,23 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, func
-from passlib.context import CryptContext
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Enum, Index, func
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import relationship, query_expression
 import enum
 
 from .database import Base
+from .compression import CompressedText
+from .dialect import utc_month_day
+from core.config import settings
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# SQLite's CURRENT_TIMESTAMP has second resolution; bind values in the same
+# format so keyset comparisons against server defaults line up.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 
 class MoodEnum(enum.Enum):
     HAPPY = "happy"
@@ -21,32 +32,41 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)  
+    # Bumped to revoke every token issued before the change
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every write to the user's entries; drives list ETags
+    diary_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set when the account is closed; its rows are purged in the background
+    deleted_at = Column(Timestamp, nullable=True)
 
     # one-to-many relationship
-    entries = relationship("DiaryEntry", back_populates="user")
-
-def hash_password(plain_password: str) -> str:
-    """Generate a hashed password using bcrypt"""
-    return pwd_context.hash(plain_password)  
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Check if the plain password matches the hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    entries = relationship("DiaryEntry", back_populates="user", passive_deletes=True)
 
 
 class DiaryEntry(Base):
     __tablename__ ="diary_entries"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
+    content = Column(CompressedText(settings.content_compression_min_bytes), nullable=False)
     mood = Column(Enum(MoodEnum))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Truncated content, filled in by queries that ask for it with with_expression()
+    preview = query_expression()
+
+    __table_args__ = (
+        # Backs keyset pagination of a user's entries, newest first
+        Index("ix_diary_entries_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        # Backs "on this day" lookups across years
+        Index("ix_diary_entries_user_id_month_day", user_id, utc_month_day(created_at)),
+    )
 
    # Relationships
     user = relationship("User", back_populates="entries")
-    tags = relationship("Tag", secondary="entry_tags", back_populates="entries") # Many-to-many
-    gratitude_items = relationship("GratitudeItem", back_populates="entry")
+    # Ordered so every serializer of an entry (see db.entry_rows) lists these the same way
+    tags = relationship("Tag", secondary="entry_tags", back_populates="entries", order_by="Tag.id") # Many-to-many
+    gratitude_items = relationship("GratitudeItem", back_populates="entry", passive_deletes=True, order_by="GratitudeItem.id")
 
 
 class Tag(Base):
@@ -54,21 +74,41 @@ class Tag(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
 
+    __table_args__ = (
+        # LIKE 'prefix%' can only use a btree built with pattern ops under non-C collations
+        Index("ix_tags_name_pattern", name, postgresql_ops={"name": "text_pattern_ops"}).ddl_if(dialect="postgresql"),
+    )
+
     # Many-to many relationship with entries
     entries = relationship("DiaryEntry", secondary="entry_tags", back_populates="tags")
 
 
 class EntryTag(Base): # Junction table
     __tablename__ = "entry_tags"
-    entry_id = Column(Integer, ForeignKey("diary_entries.id"), primary_key=True)
-    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    entry_id = Column(Integer, ForeignKey("diary_entries.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True, index=True)
 
 
 class GratitudeItem(Base):
     __tablename__ = "gratitude_items"
     id = Column(Integer, primary_key=True, index=True)
-    entry_id = Column(Integer, ForeignKey("diary_entries.id"), nullable=False)
+    entry_id = Column(Integer, ForeignKey("diary_entries.id", ondelete="CASCADE"), nullable=False, index=True)
     content = Column(Text, nullable=False)
 
     # Relationship to entry
-    entry = relationship("DiaryEntry", back_populates="gratitude_items")
\ No newline at end of file
+    entry = relationship("DiaryEntry", back_populates="gratitude_items")
+
+
+class MoodDailyRollup(Base):
+    __tablename__ = "mood_daily_rollup"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    mood = Column(Enum(MoodEnum), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class UserTagCount(Base):
+    __tablename__ = "user_tag_counts"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
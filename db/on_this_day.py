@@ -0,0 +1,74 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Any, List, Optional, Tuple
+import weakref
+
+from .dialect import utc_month_day
+from .models import DiaryEntry
+from .rollups import day_start
+from core.cache import TTLCache
+from core.metrics import Sampled, registry
+
+
+def month_day(day: date) -> int:
+    """The value utc_month_day() gives for timestamps on ``day``"""
+    return day.month * 100 + day.day
+
+
+def entries_on_this_day(db: Session, user_id: int, day: date, limit: int, options=()) -> List[DiaryEntry]:
+    """The user's entries from earlier years on ``day``'s month and day, newest first.
+
+    Served by the (user_id, utc_month_day(created_at)) expression index, so
+    the cost depends on how many entries match rather than on the diary size.
+    """
+    return db.scalars(
+        select(DiaryEntry)
+        .options(*options)
+        .where(
+            DiaryEntry.user_id == user_id,
+            utc_month_day(DiaryEntry.created_at) == month_day(day),
+            DiaryEntry.created_at < day_start(date(day.year, 1, 1)),
+        )
+        .order_by(DiaryEntry.created_at.desc(), DiaryEntry.id.desc())
+        .limit(limit)
+    ).all()
+
+
+class OnThisDayCache:
+    """Per user and month-day results, each stored with the diary version it was read at.
+
+    A result is served only while the user's ``diary_version`` still matches,
+    so a write through any worker retires it in every worker's cache.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.hits = 0
+        self.misses = 0
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+        _caches.add(self)
+
+    def get(self, user_id: int, day: date, version: int) -> Optional[Tuple[str, Any]]:
+        """(etag, payload) cached for ``day`` at ``version``, if any"""
+        item = self._results.get((user_id, month_day(day)))
+        if item is None or item[:2] != (day, version):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item[2], item[3]
+
+    def put(self, user_id: int, day: date, version: int, etag: str, payload: Any):
+        """Cache a result read at diary ``version``, which must be read before the entries"""
+        self._results.set((user_id, month_day(day)), (day, version, etag, payload))
+
+
+# One cache per app, like one per worker; /metrics sums them
+_caches: "weakref.WeakSet[OnThisDayCache]" = weakref.WeakSet()
+
+registry.register(Sampled(
+    "on_this_day_cache_hits_total", "On-this-day lookups served from cache", "counter",
+    lambda: sum(cache.hits for cache in _caches)
+))
+registry.register(Sampled(
+    "on_this_day_cache_misses_total", "On-this-day lookups that went to the database", "counter",
+    lambda: sum(cache.misses for cache in _caches)
+))
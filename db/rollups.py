@@ -0,0 +1,137 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from collections import Counter
+from datetime import date, datetime, time as day_time, timedelta, timezone
+from typing import List, Optional, Tuple
+import enum
+
+from .dialect import dialect_insert, utc_date
+from .models import DiaryEntry, EntryTag, MoodDailyRollup, MoodEnum, UserTagCount
+
+
+def entry_day(created_at: datetime) -> date:
+    """UTC calendar day an entry counts towards"""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def day_start(day: date) -> datetime:
+    """First instant of the UTC calendar day ``day``.
+
+    Aware, so PostgreSQL compares it against timestamptz in UTC rather than
+    in the session's time zone.
+    """
+    return datetime.combine(day, day_time.min, tzinfo=timezone.utc)
+
+
+def created_between(first: Optional[date], last: Optional[date]) -> List:
+    """Conditions keeping entries created on UTC days ``first`` through ``last``, inclusive"""
+    criteria = []
+    if first:
+        criteria.append(DiaryEntry.created_at >= day_start(first))
+    if last == date.max:
+        # There is no next day to stop before
+        criteria.append(DiaryEntry.created_at <= datetime.max.replace(tzinfo=timezone.utc))
+    elif last:
+        criteria.append(DiaryEntry.created_at < day_start(last + timedelta(days=1)))
+    return criteria
+
+
+def mood_key(created_at: datetime, mood: Optional[MoodEnum]) -> Optional[Tuple[date, MoodEnum]]:
+    """Rollup key for an entry, or None when it has no mood to count"""
+    if mood is None:
+        return None
+    return entry_day(created_at), mood
+
+
+def _key_order(index_elements):
+    """Sort key for upsert rows: their key columns, enums by value"""
+    def key(row):
+        return tuple(
+            row[name].value if isinstance(row[name], enum.Enum) else row[name]
+            for name in index_elements
+        )
+    return key
+
+
+def _add_counts(db: Session, model, index_elements, rows):
+    """Upsert rows, adding their ``count`` to any existing row with the same key"""
+    if not rows:
+        return
+    # Rows locked in key order, so two writers touching the same keys cannot deadlock
+    rows = sorted(rows, key=_key_order(index_elements))
+    stmt = dialect_insert(db, model.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={"count": model.count + stmt.excluded["count"]},
+    )
+    db.execute(stmt, rows)
+
+
+def apply_mood_deltas(db: Session, user_id: int, deltas: Counter):
+    """Add mood_key -> entry count changes to the rollup in the caller's transaction"""
+    _add_counts(db, MoodDailyRollup, ["user_id", "day", "mood"], [
+        {"user_id": user_id, "day": key[0], "mood": key[1], "count": delta}
+        for key, delta in deltas.items()
+        if key is not None and delta
+    ])
+
+
+def apply_tag_deltas(db: Session, user_id: int, deltas: Counter):
+    """Add tag_id -> entry count changes to user_tag_counts in the caller's transaction"""
+    _add_counts(db, UserTagCount, ["user_id", "tag_id"], [
+        {"user_id": user_id, "tag_id": tag_id, "count": delta}
+        for tag_id, delta in deltas.items()
+        if delta
+    ])
+
+
+def rebuild_mood_rollups(db: Session, user_id: Optional[int] = None):
+    """Recompute the rollup from diary_entries, for one user or everyone"""
+    clear = delete(MoodDailyRollup)
+    source = (
+        select(DiaryEntry.user_id, utc_date(DiaryEntry.created_at), DiaryEntry.mood, func.count())
+        .where(DiaryEntry.mood.is_not(None))
+        .group_by(DiaryEntry.user_id, utc_date(DiaryEntry.created_at), DiaryEntry.mood)
+    )
+    if user_id is not None:
+        clear = clear.where(MoodDailyRollup.user_id == user_id)
+        source = source.where(DiaryEntry.user_id == user_id)
+    db.execute(clear)
+    db.execute(
+        insert(MoodDailyRollup).from_select(["user_id", "day", "mood", "count"], source)
+    )
+    db.commit()
+
+
+def rebuild_tag_counts(db: Session, user_id: Optional[int] = None):
+    """Recompute user_tag_counts from entry_tags, for one user or everyone"""
+    clear = delete(UserTagCount)
+    source = (
+        select(DiaryEntry.user_id, EntryTag.tag_id, func.count())
+        .join(EntryTag, EntryTag.entry_id == DiaryEntry.id)
+        .group_by(DiaryEntry.user_id, EntryTag.tag_id)
+    )
+    if user_id is not None:
+        clear = clear.where(UserTagCount.user_id == user_id)
+        source = source.where(DiaryEntry.user_id == user_id)
+    db.execute(clear)
+    db.execute(
+        insert(UserTagCount).from_select(["user_id", "tag_id", "count"], source)
+    )
+    db.commit()
+
+
+if __name__ == "__main__":
+    import argparse
+    from core.config import settings
+    from .database import Sessionlocal, configure_engine
+
+    parser = argparse.ArgumentParser(description="Rebuild the mood_daily_rollup and user_tag_counts tables from diary entries")
+    parser.add_argument("--user-id", type=int, help="only rebuild this user's rollup")
+    args = parser.parse_args()
+    configure_engine(settings)
+    with Sessionlocal() as db:
+        rebuild_mood_rollups(db, args.user_id)
+        rebuild_tag_counts(db, args.user_id)
@@ -0,0 +1,79 @@
+from sqlalchemy import func, literal_column, select, table, column
+from sqlalchemy.orm import Session
+from typing import List, Tuple
+
+from .models import DiaryEntry
+
+
+# Search objects the migrations create outside Base.metadata (a generated
+# tsvector column with a GIN index on PostgreSQL, an FTS5 table kept in sync
+# by triggers on SQLite), which Alembic's autogenerate would otherwise see as
+# stray and emit drops for
+SEARCH_TABLE_PREFIX = "diary_entries_fts"
+SEARCH_COLUMNS = {("diary_entries", "search_vector")}
+SEARCH_INDEXES = {"ix_diary_entries_search_vector"}
+
+
+def _created_on(index, dialect: str) -> bool:
+    """Whether an index limited to some dialects with ddl_if() exists on ``dialect``"""
+    ddl_if = getattr(index, "_ddl_if", None)
+    if ddl_if is None or ddl_if.dialect is None:
+        return True
+    dialects = (ddl_if.dialect,) if isinstance(ddl_if.dialect, str) else ddl_if.dialect
+    return dialect in dialects
+
+
+def include_object(object, name, type_, reflected, compare_to, dialect: str) -> bool:
+    """Alembic include_object hook that leaves the search objects alone.
+
+    Bind ``dialect`` to the name of the database being compared: indexes the
+    models create only on other dialects (ddl_if) are not reported missing.
+    """
+    if type_ == "index" and not reflected and not _created_on(object, dialect):
+        return False
+    if not reflected or compare_to is not None:
+        return True
+    if type_ == "table":
+        # The FTS5 table and its shadow tables (_data, _idx, _docsize, _config)
+        return not name.startswith(SEARCH_TABLE_PREFIX)
+    if type_ == "column":
+        return (object.table.name, name) not in SEARCH_COLUMNS
+    if type_ == "index":
+        return name not in SEARCH_INDEXES
+    return True
+
+
+_fts = table("diary_entries_fts", column("rowid"))
+_fts_table = literal_column("diary_entries_fts")
+
+
+def _fts5_query(q: str) -> str:
+    """Quote each term so user input is matched literally, all terms required"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def search_entries(db: Session, user_id: int, q: str, limit: int, options=()) -> List[Tuple[DiaryEntry, float, str]]:
+    """Return (entry, rank, snippet) for the user's best matches, best first.
+
+    Higher rank is better on both backends; snippets mark hits with <b></b>.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        query = func.websearch_to_tsquery("english", q)
+        vector = literal_column("diary_entries.search_vector")
+        rank = func.ts_rank(vector, query)
+        snippet = func.ts_headline("english", DiaryEntry.content, query, "MaxFragments=1, MaxWords=24, MinWords=8")
+        stmt = (
+            select(DiaryEntry, rank.label("rank"), snippet.label("snippet"))
+            .where(DiaryEntry.user_id == user_id, vector.op("@@")(query))
+            .order_by(rank.desc())
+        )
+    else:
+        bm25 = func.bm25(_fts_table)
+        snippet = func.snippet(_fts_table, -1, "<b>", "</b>", "…", 24)
+        stmt = (
+            select(DiaryEntry, (-bm25).label("rank"), snippet.label("snippet"))
+            .join(_fts, _fts.c.rowid == DiaryEntry.id)
+            .where(DiaryEntry.user_id == user_id, _fts_table.op("MATCH")(_fts5_query(q)))
+            .order_by(bm25)
+        )
+    return db.execute(stmt.options(*options).limit(limit)).all()
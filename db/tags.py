@@ -0,0 +1,43 @@
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable
+
+from .dialect import dialect_insert
+from .models import Tag, EntryTag
+
+
+def resolve_tag_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Map tag names to ids, creating the missing tags.
+
+    One lookup plus one ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` for the
+    misses. Names a concurrent writer inserted first are picked up by a final
+    lookup, so the unique index on ``tags.name`` is never violated.
+    """
+    wanted = list(dict.fromkeys(names))
+    if not wanted:
+        return {}
+
+    tag_ids = dict(db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(wanted))).all())
+    # Sorted, so concurrent writers creating overlapping tags take the unique
+    # index's locks in the same order instead of deadlocking on each other
+    missing = sorted(name for name in wanted if name not in tag_ids)
+    if missing:
+        stmt = (
+            dialect_insert(db, Tag)
+            .values([{"name": name} for name in missing])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Tag.name, Tag.id)
+        )
+        tag_ids.update(db.execute(stmt).all())
+
+        raced = [name for name in missing if name not in tag_ids]
+        if raced:
+            tag_ids.update(db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(raced))).all())
+    return tag_ids
+
+
+def link_tags(db: Session, entry_id: int, tag_ids: Iterable[int]):
+    """Attach tags to an entry with a single executemany"""
+    rows = [{"entry_id": entry_id, "tag_id": tag_id} for tag_id in tag_ids]
+    if rows:
+        db.execute(insert(EntryTag), rows)
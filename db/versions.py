@@ -0,0 +1,26 @@
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from .database import mark_write
+from .models import User, DiaryEntry
+
+
+def touch_diary(db: Session, user_id: int):
+    """Bump the user's diary version; every write to their entries must call this"""
+    mark_write(db, user_id)
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(diary_version=User.diary_version + 1)
+    )
+
+
+def diary_version(db: Session, user_id: int) -> int:
+    return db.scalar(select(User.diary_version).where(User.id == user_id))
+
+
+def entry_version(db: Session, entry_id: int, user_id: int) -> Optional[int]:
+    return db.scalar(
+        select(DiaryEntry.version).where(DiaryEntry.id == entry_id, DiaryEntry.user_id == user_id)
+    )
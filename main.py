@@ -1,41 +1,42 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.middleware.gzip import GZipMiddleware
+from contextlib import asynccontextmanager
+from typing import Optional
 from datetime import timedelta
 
-from db.database import get_db, engine, Base
+from db.database import (
+    DbSession, get_db, check_engine_settings, configure_engine, dispose_engine, dispose_async_engine,
+)
 from api.user import router as user_router
 from api.diary import router as diary_rouer
+from api.stats import router as stats_router
+from api.tags import router as tags_router
 from schemas.user import Token
 from core.auth import authenticate_user, ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
+from core.admission import AdmissionMiddleware, BucketBackend
+from core.config import IMPORT_TIME_FIELDS, Settings, settings as default_settings
+from core.hashing import password_hasher
+from core.metrics import MetricsMiddleware, registry
+from db.on_this_day import OnThisDayCache
 
 
-Base.metadata.create_all(bind=engine)
+router = APIRouter()
 
-app = FastAPI(
-    title="Digital Diary API",
-    description="A simple API for managing your digital diary entries with mood tracking and gratitude lists"
-)
+# Apps whose lifespan is running. The engines and the bcrypt pool are shared
+# by every app in the process, so only the last one to stop shuts them down.
+_running_apps = 0
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(user_router, prefix="/api")
-app.include_router(diary_rouer, prefix="/api")
-
-@app.post("/token", response_model=Token)
+@router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     """Login endpoint to get access token"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,7 +45,85 @@ async def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id, "ver": user.token_version},
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of request, SQL and pool metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def create_app(settings: Settings = default_settings, bucket_backend: Optional[BucketBackend] = None) -> FastAPI:
+    """Build the application; the database engine is set up by the lifespan.
+
+    Nothing here connects to the database or touches the schema, which is
+    managed by Alembic migrations only. Rate limit state lives in this process
+    unless ``bucket_backend`` points somewhere shared; each app has its own
+    on-this-day cache, checked against the database on every read.
+
+    ``settings`` configures the engines, admission control, gzip and the
+    on-this-day cache. The fields in core.config.IMPORT_TIME_FIELDS are fixed
+    when their modules are imported; passing different values for them raises
+    ValueError. The engines are shared by every app in the process, so
+    core.config.ENGINE_FIELDS that differ from those of the engines already
+    configured raise ValueError too, here or when the app starts.
+    """
+    fixed = sorted(
+        name for name in IMPORT_TIME_FIELDS
+        if getattr(settings, name) != getattr(default_settings, name)
+    )
+    if fixed:
+        raise ValueError(f"create_app() cannot override {', '.join(fixed)}; set them in the environment")
+    check_engine_settings(settings)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        global _running_apps
+        configure_engine(settings)
+        _running_apps += 1
+        try:
+            yield
+        finally:
+            _running_apps -= 1
+            if not _running_apps:
+                password_hasher.shutdown()
+                await dispose_async_engine()
+                dispose_engine()
+
+    app = FastAPI(
+        title="Digital Diary API",
+        description="A simple API for managing your digital diary entries with mood tracking and gratitude lists",
+        lifespan=lifespan
+    )
+    app.state.on_this_day_cache = OnThisDayCache(
+        maxsize=settings.on_this_day_cache_size, ttl=settings.on_this_day_cache_ttl
+    )
+
+    if settings.admission_enabled:
+        # Innermost, so CORS preflights are answered first and refusals still carry CORS headers
+        app.add_middleware(AdmissionMiddleware, settings=settings, backend=bucket_backend)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Query-Count", "Server-Timing"],
+    )
+    # Entry prose compresses several times over; small bodies are not worth the CPU
+    app.add_middleware(GZipMiddleware, minimum_size=settings.response_gzip_min_bytes)
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(router)
+    app.include_router(user_router, prefix="/api")
+    app.include_router(diary_rouer, prefix="/api")
+    app.include_router(stats_router, prefix="/api")
+    app.include_router(tags_router, prefix="/api")
+    return app
+
+
+app = create_app()
@@ -1,9 +1,15 @@
-from pydantic import BaseModel, ConfigDict
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, BeforeValidator, ConfigDict, field_validator
+from datetime import date, datetime
+from typing import Annotated, Optional, List
+import enum
 
+from db.compression import decompress_text
 from db.models import MoodEnum
 
+# Entry content as loaded, possibly still compressed, decompressed here when
+# a response is built
+StoredText = Annotated[str, BeforeValidator(decompress_text)]
+
 
 class TagBase(BaseModel):
     name: str
@@ -44,7 +50,23 @@ class DiaryEntryBase(BaseModel):
 class DiaryEntryCreate(DiaryEntryBase):
     pass
 
+class DiaryEntryUpdate(BaseModel):
+    """Partial update; fields left out of the request keep their current value"""
+    title: Optional[str] = None
+    content: Optional[str] = None
+    mood: Optional[MoodEnum] = None
+    tags: Optional[List[str]] = None
+    gratitude_items: Optional[List[str]] = None
+
+    @field_validator("title", "content")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 class DiaryEntryResponse(DiaryEntryBase):
+    content: StoredText
     id: int
     user_id: int
     created_at: datetime
@@ -54,3 +76,72 @@ class DiaryEntryResponse(DiaryEntryBase):
     model_config = ConfigDict(
         from_attributes=True
     )
+
+
+class TagUsage(TagBase):
+    id: int
+    count: int
+
+
+class TagMatch(str, enum.Enum):
+    ANY = "any"
+    ALL = "all"
+
+
+class EntryView(str, enum.Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
+class DiaryEntrySparse(BaseModel):
+    """Any subset of an entry's fields; unrequested ones are left unset and not serialized"""
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    title: Optional[str] = None
+    content: Optional[StoredText] = None
+    preview: Optional[str] = None
+    mood: Optional[MoodEnum] = None
+    tags: Optional[List[TagResponse]] = None
+    gratitude_items: Optional[List[GratitudeItemResponse]] = None
+
+    model_config = ConfigDict(
+        from_attributes=True
+    )
+
+
+class CalendarDay(BaseModel):
+    day: date
+    count: int
+    dominant_mood: Optional[MoodEnum] = None
+
+class CalendarResponse(BaseModel):
+    year: int
+    days: List[CalendarDay]
+
+
+class DiaryEntrySearchResult(BaseModel):
+    entry: DiaryEntryResponse
+    rank: float
+    snippet: str
+
+
+class BulkImportError(BaseModel):
+    line: int
+    error: str
+
+class BulkImportResponse(BaseModel):
+    imported: int
+    failed: int
+    batches: int
+    elapsed_seconds: float
+    entries_per_second: float
+    errors: List[BulkImportError] = []
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
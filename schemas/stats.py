@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import Dict, List
+import enum
+
+from db.models import MoodEnum
+
+
+class Granularity(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class MoodBucket(BaseModel):
+    period_start: date
+    counts: Dict[MoodEnum, int]
+    total: int
+
+class MoodStreaks(BaseModel):
+    current: int
+    longest: int
+
+class MoodStatsResponse(BaseModel):
+    granularity: Granularity
+    buckets: List[MoodBucket]
+    streaks: MoodStreaks
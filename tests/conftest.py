@@ -0,0 +1,70 @@
+"""Fixtures shared by the whole suite: one migrated scratch database and one app.
+
+The database is a temporary SQLite file, built with the Alembic migrations
+exactly as a deploy builds it. Point TEST_DATABASE_URL at a disposable
+PostgreSQL database to run the suite there instead.
+"""
+import itertools
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "tests.db")
+)
+os.environ.setdefault("DATABASE_SSLMODE", "disable")
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Tests send bursts no real client would; admission control is tested on apps of its own
+os.environ["ADMISSION_ENABLED"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from db import database
+from db.migrations import upgrade_to_head
+from main import app
+
+_usernames = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def client():
+    upgrade_to_head()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def engine(client):
+    """The app's primary engine, bound once the client has started the app"""
+    return database.engine
+
+
+@pytest.fixture
+def db(engine):
+    with database.Sessionlocal() as session:
+        yield session
+
+
+@pytest.fixture
+def user(client):
+    """A freshly registered user: (id, headers carrying their access token)"""
+    username = f"user{next(_usernames)}"
+    user_id = client.post("/api/register", json={"username": username, "password": "secret"}).json()["id"]
+    token = client.post("/token", data={"username": username, "password": "secret"}).json()["access_token"]
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def statements(engine):
+    """Every (statement, parameters) the engine runs while it is active"""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # executemany passes a list of parameter sets; insertmanyvalues batches pass one
+        recorded.append((statement, parameters[0] if isinstance(parameters, list) else parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine, "before_cursor_execute", record)
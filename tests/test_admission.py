@@ -0,0 +1,125 @@
+"""Admission control in front of a bare app: token buckets and the in-flight cap."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from core.admission import (
+    AdmissionMiddleware, BucketBackend, InProcessBuckets, KeyValueStore, LocalKeyValueStore, StoreBuckets,
+)
+from core.auth import create_access_token
+from core.config import Settings
+
+# Buckets refill so slowly that a test never sees a token come back
+SLOW = {"admission_ip_rate": 1e-6, "admission_user_rate": 1e-6, "admission_expensive_rate": 1e-6}
+
+
+async def ok(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def admitted(backend: BucketBackend, **settings) -> TestClient:
+    settings = Settings(**{**SLOW, **settings})
+    return TestClient(AdmissionMiddleware(ok, settings=settings, backend=backend))
+
+
+def bearer(username: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": username})}
+
+
+@pytest.fixture(params=["in_process", "store"])
+def backend(request) -> BucketBackend:
+    return InProcessBuckets() if request.param == "in_process" else StoreBuckets(LocalKeyValueStore())
+
+
+def test_backends_must_implement_every_operation():
+    with pytest.raises(TypeError):
+        BucketBackend()
+    with pytest.raises(TypeError):
+        KeyValueStore()
+
+
+def test_a_refusal_spends_from_no_other_bucket(backend):
+    client = admitted(backend, admission_ip_enabled=True, admission_ip_burst=3, admission_user_burst=1)
+
+    assert client.get("/", headers=bearer("alice")).status_code == 200
+    # alice's bucket is empty; her refusals must leave the shared IP bucket alone
+    for _ in range(5):
+        assert client.get("/", headers=bearer("alice")).status_code == 429
+    assert [client.get("/").status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_per_ip_buckets_are_off_by_default(backend):
+    client = admitted(backend, admission_ip_burst=1, admission_expensive_burst=2)
+
+    assert [client.get("/").status_code for _ in range(5)] == [200] * 5
+    # Anonymous logins and registrations still have a budget per IP
+    assert [client.post("/token").status_code for _ in range(3)] == [200, 200, 429]
+    assert [client.post("/api/register").status_code for _ in range(3)] == [200, 200, 429]
+    # Users are still limited by their own budget
+    client = admitted(backend, admission_user_burst=1)
+    assert [client.get("/", headers=bearer("bob")).status_code for _ in range(2)] == [200, 429]
+
+
+def test_trusted_proxies_key_on_the_address_they_forwarded(backend):
+    client = admitted(backend, admission_ip_enabled=True, admission_trusted_proxies=1, admission_ip_burst=1)
+
+    def get(forwarded_for: str) -> int:
+        return client.get("/", headers={"X-Forwarded-For": forwarded_for}).status_code
+
+    assert get("203.0.113.7") == 200
+    assert get("198.51.100.2") == 200
+    # Whatever the client put in front of the proxy's entry is ignored
+    assert get("192.0.2.1, 203.0.113.7") == 429
+    assert get("192.0.2.2, 203.0.113.7") == 429
+
+
+def test_rate_limited_responses_carry_retry_after(backend):
+    client = admitted(backend, admission_expensive_burst=1, admission_expensive_rate=0.25)
+
+    client.post("/token")
+    response = client.post("/token")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "4"
+
+
+def shed(limit: int, queue: int, timeout: float, requests: int, held_for: float) -> list:
+    """Responses to ``requests`` concurrent calls to an app that holds every
+    admitted request for ``held_for`` seconds"""
+    release = asyncio.Event()
+
+    async def held(scope, receive, send):
+        await release.wait()
+        await ok(scope, receive, send)
+
+    settings = Settings(
+        admission_max_in_flight=limit, admission_max_queue=queue, admission_queue_timeout=timeout
+    )
+    middleware = AdmissionMiddleware(held, settings=settings)
+
+    async def run():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            pending = [asyncio.ensure_future(client.get("/")) for _ in range(requests)]
+            await asyncio.sleep(held_for)
+            release.set()
+            return await asyncio.gather(*pending)
+
+    return asyncio.run(run())
+
+
+def test_requests_past_a_full_queue_are_shed():
+    responses = shed(limit=1, queue=1, timeout=5, requests=4, held_for=0.1)
+
+    assert sorted(response.status_code for response in responses) == [200, 200, 503, 503]
+    assert all(response.headers["Retry-After"] == "1" for response in responses if response.status_code == 503)
+
+
+def test_queued_requests_are_shed_when_their_wait_times_out():
+    responses = shed(limit=1, queue=2, timeout=0.05, requests=3, held_for=0.3)
+
+    assert sorted(response.status_code for response in responses) == [200, 503, 503]
+    assert all(response.headers["Retry-After"] == "1" for response in responses if response.status_code == 503)
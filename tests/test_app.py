@@ -0,0 +1,25 @@
+"""Several apps in one process share the engines and the bcrypt pool."""
+import pytest
+from fastapi.testclient import TestClient
+
+from core.config import settings
+from db import database
+from main import create_app
+
+
+def test_other_database_settings_are_refused_not_ignored(engine):
+    for override in (
+        {"database_url": "sqlite:///elsewhere.db"},
+        {"database_read_url": "sqlite:///replica.db"},
+        {"database_async": not settings.database_async},
+    ):
+        with pytest.raises(ValueError, match=next(iter(override))):
+            create_app(settings.model_copy(update=override))
+
+
+def test_stopping_one_app_leaves_the_others_running(client, engine):
+    with TestClient(create_app()) as other:
+        assert other.get("/metrics").status_code == 200
+
+    assert database.engine is engine
+    assert client.post("/api/register", json={"username": "survivor", "password": "secret"}).status_code == 200
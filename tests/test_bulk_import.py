@@ -0,0 +1,31 @@
+"""NDJSON imports commit batch by batch and always say how far they got."""
+import json
+
+import pytest
+
+from core.ndjson import MAX_LINE_BYTES
+
+ENTRY = {"title": "Imported", "content": "c", "tags": [], "gratitude_items": []}
+
+
+def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+@pytest.mark.parametrize("chunk_size", [None, 64 * 1024], ids=["whole", "streamed"])
+def test_an_oversized_line_stops_the_import_with_a_summary(client, user, chunk_size):
+    _, headers = user
+    lines = [json.dumps(ENTRY)] * 3 + ["x" * (MAX_LINE_BYTES + 1), json.dumps(ENTRY)]
+    body = "\n".join(lines).encode()
+
+    response = client.post(
+        "/api/entries/bulk?batch_size=2", content=chunked(body, chunk_size) if chunk_size else body, headers=headers
+    )
+
+    assert response.status_code == 413
+    summary = response.json()
+    assert (summary["imported"], summary["failed"], summary["batches"]) == (3, 1, 2)
+    assert summary["errors"] == [{"line": 4, "error": f"NDJSON line exceeds {MAX_LINE_BYTES} bytes"}]
+    # Exactly the batches the summary reports were committed; the line after the oversized one was not read
+    assert len(client.get("/api/entries", headers=headers).json()) == 3
@@ -0,0 +1,64 @@
+"""Long entry content is stored compressed and only decompressed for responses."""
+import zlib
+
+import pytest
+from sqlalchemy import select
+
+from db import compression
+from db.models import DiaryEntry
+from schemas.diary import DiaryEntryResponse
+
+ENTRY = {
+    "title": "Long walk",
+    "content": "We walked along the river until the light went. " * 40,
+    "mood": "calm",
+    "tags": ["walk"],
+    "gratitude_items": ["the river"],
+}
+
+
+@pytest.fixture
+def decompressions(monkeypatch):
+    """How many times compressed content has been decompressed so far"""
+    calls, decompress = [], zlib.decompress
+
+    def counting(data, *args):
+        calls.append(len(data))
+        return decompress(data, *args)
+
+    monkeypatch.setattr(compression.zlib, "decompress", counting)
+    return calls
+
+
+@pytest.fixture
+def entry_id(client, engine, user):
+    if engine.dialect.name != "sqlite":
+        pytest.skip("content is only compressed on SQLite")
+    _, headers = user
+    return client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+
+
+def test_loaded_content_stays_compressed_until_serialized(db, entry_id, decompressions):
+    entry = db.scalar(select(DiaryEntry).where(DiaryEntry.id == entry_id))
+
+    assert isinstance(entry.content, bytes) and entry.content.startswith(compression.HEADER)
+    assert decompressions == []
+    assert DiaryEntryResponse.model_validate(entry, from_attributes=True).content == ENTRY["content"]
+    assert len(decompressions) == 1
+
+
+def test_routes_decompress_only_what_they_return(client, user, entry_id, decompressions, statements):
+    _, headers = user
+
+    assert client.patch(f"/api/entries/{entry_id}", json={"mood": "happy"}, headers=headers).json()["content"] == ENTRY["content"]
+    assert len(decompressions) == 1
+
+    decompressions.clear()
+    assert client.get("/api/entries/calendar?year=2026", headers=headers).status_code == 200
+    assert client.get("/api/stats/mood", headers=headers).status_code == 200
+    assert decompressions == []
+
+    # Unchanged content is compared as text, so it writes nothing
+    statements.clear()
+    assert client.patch(f"/api/entries/{entry_id}", json={"content": ENTRY["content"]}, headers=headers).status_code == 200
+    assert not [statement for statement, _ in statements if statement.lstrip().startswith("UPDATE")]
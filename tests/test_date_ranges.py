@@ -0,0 +1,80 @@
+"""``from``/``to`` filters select whole UTC days, up to the last representable one."""
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import update
+
+from db.models import DiaryEntry
+from db.rollups import day_start
+
+# (created_at in UTC, inside 2025-03-01)
+TIMES = [
+    (datetime(2025, 2, 28, 23, 59, 59), False),
+    (datetime(2025, 3, 1, 0, 0, 0), True),
+    (datetime(2025, 3, 1, 23, 59, 59), True),
+    (datetime(2025, 3, 2, 0, 0, 0), False),
+]
+
+
+@pytest.fixture
+def entries(client, db, user):
+    """Entries either side of both edges of 2025-03-01; (headers, ids inside, all ids)"""
+    _, headers = user
+    inside, created = set(), []
+    for created_at, is_inside in TIMES:
+        entry_id = client.post(
+            "/api/entries", json={"title": "t", "content": "c", "tags": [], "gratitude_items": []}, headers=headers
+        ).json()["id"]
+        db.execute(update(DiaryEntry).where(DiaryEntry.id == entry_id).values(created_at=created_at.replace(tzinfo=timezone.utc)))
+        db.commit()
+        created.append(entry_id)
+        if is_inside:
+            inside.add(entry_id)
+    return headers, inside, set(created)
+
+
+def test_day_start_is_utc():
+    assert day_start(date(2025, 3, 1)) == datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+
+def test_list_keeps_both_edges_of_the_day(client, entries):
+    headers, inside, _ = entries
+    response = client.get("/api/entries", params={"from": "2025-03-01", "to": "2025-03-01"}, headers=headers)
+    assert {entry["id"] for entry in response.json()} == inside
+
+
+def test_bulk_delete_removes_exactly_the_day(client, entries):
+    headers, inside, created = entries
+    response = client.delete("/api/entries", params={"from": "2025-03-01", "to": "2025-03-01"}, headers=headers)
+    assert response.json() == {"deleted": len(inside)}
+    left = {entry["id"] for entry in client.get("/api/entries", headers=headers).json()}
+    assert left == created - inside
+
+
+@pytest.mark.parametrize("params", [{"to": "9999-12-31"}, {"from": "0001-01-01", "to": "9999-12-31"}])
+def test_list_accepts_the_last_representable_day(client, entries, params):
+    headers, _, created = entries
+    response = client.get("/api/entries", params=params, headers=headers)
+    assert response.status_code == 200
+    assert {entry["id"] for entry in response.json()} == created
+
+
+def test_bulk_delete_accepts_the_last_representable_day(client, entries):
+    headers, _, created = entries
+    response = client.delete("/api/entries", params={"from": "2025-03-02", "to": "9999-12-31"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 1}
+
+
+def test_calendar_covers_the_last_representable_year(client, db, entries):
+    headers, _, created = entries
+    db.execute(
+        update(DiaryEntry).where(DiaryEntry.id == min(created))
+        .values(created_at=datetime(9999, 12, 31, 23, 59, 59, tzinfo=timezone.utc))
+    )
+    db.commit()
+
+    response = client.get("/api/entries/calendar", params={"year": 9999}, headers=headers)
+    assert response.status_code == 200
+    assert [(day["day"], day["count"]) for day in response.json()["days"]] == [("9999-12-31", 1)]
+    assert client.get("/api/entries/calendar", params={"year": 10000}, headers=headers).status_code == 422
@@ -0,0 +1,29 @@
+"""Logging in checks the password off the event loop and upgrades old hashes."""
+from sqlalchemy import select
+
+from core.config import settings
+from core.hashing import password_context
+from db.models import User
+
+
+def test_login_rehashes_passwords_stored_at_another_cost(client, db):
+    old_hash = password_context(settings.bcrypt_rounds + 1).hash("secret")
+    db.add(User(username="rehash", hashed_password=old_hash))
+    db.commit()
+
+    response = client.post("/token", data={"username": "rehash", "password": "secret"})
+
+    assert response.status_code == 200
+    stored = db.scalar(select(User.hashed_password).where(User.username == "rehash"))
+    assert stored != old_hash
+    assert password_context(settings.bcrypt_rounds).verify("secret", stored)
+    assert not password_context(settings.bcrypt_rounds).needs_update(stored)
+    assert client.post("/token", data={"username": "rehash", "password": "secret"}).status_code == 200
+
+
+def test_login_rejects_unknown_users_and_wrong_passwords(client, db):
+    db.add(User(username="wrong", hashed_password=password_context(settings.bcrypt_rounds).hash("secret")))
+    db.commit()
+
+    assert client.post("/token", data={"username": "nobody", "password": "secret"}).status_code == 401
+    assert client.post("/token", data={"username": "wrong", "password": "guess"}).status_code == 401
@@ -0,0 +1,49 @@
+"""On-this-day results cached by one worker never outlive a write through another."""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from db.models import DiaryEntry
+from main import create_app
+
+ENTRY = {"title": "Spring", "content": "First warm day", "mood": "happy", "tags": ["spring"], "gratitude_items": []}
+URL = "/api/entries/on-this-day?date=2026-03-05"
+
+
+@pytest.fixture
+def other_worker(client):
+    """A second app with a cache of its own, sharing the database already set up by ``client``"""
+    return TestClient(create_app())
+
+
+def test_a_write_through_one_app_retires_what_another_cached(client, other_worker, db, user):
+    _, headers = user
+    entry_id = client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+    db.execute(update(DiaryEntry).where(DiaryEntry.id == entry_id).values(created_at=datetime(2024, 3, 5, 12, tzinfo=timezone.utc)))
+    db.commit()
+
+    first = other_worker.get(URL, headers=headers)
+    assert [entry["title"] for entry in first.json()] == ["Spring"]
+    assert other_worker.get(URL, headers={**headers, "If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    assert client.patch(f"/api/entries/{entry_id}", json={"title": "Early spring"}, headers=headers).status_code == 200
+
+    after = other_worker.get(URL, headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert [entry["title"] for entry in after.json()] == ["Early spring"]
+    assert after.headers["ETag"] != first.headers["ETag"]
+
+
+def test_a_write_to_another_day_keeps_the_etag(client, other_worker, db, user):
+    _, headers = user
+    entry_id = client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+    db.execute(update(DiaryEntry).where(DiaryEntry.id == entry_id).values(created_at=datetime(2024, 3, 5, 12, tzinfo=timezone.utc)))
+    db.commit()
+    etag = other_worker.get(URL, headers=headers).headers["ETag"]
+
+    client.post("/api/entries", json={**ENTRY, "title": "Today"}, headers=headers)
+
+    # The cached result is retired, but re-reading it finds the same entries
+    assert other_worker.get(URL, headers={**headers, "If-None-Match": etag}).status_code == 304
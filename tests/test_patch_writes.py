@@ -0,0 +1,56 @@
+"""A PATCH writes only what changed."""
+import pytest
+
+ENTRY = {
+    "title": "Monday",
+    "content": "Long walk by the river. " * 40,
+    "mood": "calm",
+    "tags": ["walk", "river", "outdoors", "monday"],
+    "gratitude_items": ["sunshine", "coffee", "a quiet morning"],
+}
+
+
+def writes(statements) -> list:
+    """First three words of every INSERT, UPDATE and DELETE recorded"""
+    return [
+        " ".join(statement.split()[:3])
+        for statement, _ in statements
+        if statement.lstrip().split(None, 1)[0] in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+def test_title_only_patch_updates_the_entry_row_and_diary_version_only(client, user, statements):
+    _, headers = user
+    entry_id = client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+    statements.clear()
+
+    response = client.patch(f"/api/entries/{entry_id}", json={"title": "Monday, again"}, headers=headers)
+
+    assert response.status_code == 200
+    assert writes(statements) == ["UPDATE diary_entries SET", "UPDATE users SET"]
+
+
+def test_unchanged_patch_writes_nothing(client, user, statements):
+    _, headers = user
+    entry_id = client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+    statements.clear()
+
+    response = client.patch(f"/api/entries/{entry_id}", json={"tags": ENTRY["tags"]}, headers=headers)
+
+    assert response.status_code == 200
+    assert writes(statements) == []
+
+
+@pytest.mark.parametrize("changes, expected", [
+    ({"tags": ["walk", "river", "outdoors", "tuesday"]}, {"DELETE FROM entry_tags", "INSERT INTO entry_tags"}),
+    ({"gratitude_items": ["sunshine", "coffee", "a quiet morning", "friends"]}, {"INSERT INTO gratitude_items"}),
+])
+def test_collection_patch_touches_only_changed_rows(client, user, statements, changes, expected):
+    _, headers = user
+    entry_id = client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+    statements.clear()
+
+    client.patch(f"/api/entries/{entry_id}", json=changes, headers=headers).raise_for_status()
+
+    touched = {write for write in writes(statements) if "entry_tags" in write or "gratitude_items" in write}
+    assert touched == expected
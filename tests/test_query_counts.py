@@ -0,0 +1,39 @@
+"""A list page costs the same number of queries whatever its size."""
+import pytest
+
+from db.bulk import insert_entries
+from schemas.diary import DiaryEntryCreate
+
+PAGE_SIZES = [1, 10, 100]
+
+
+@pytest.fixture
+def diary(db, user):
+    user_id, headers = user
+    insert_entries(db, user_id, [
+        DiaryEntryCreate(
+            title=f"Day {i}",
+            content="walk by the river",
+            mood="calm",
+            tags=["walk", f"tag{i % 7}"],
+            gratitude_items=["coffee", "sunlight"],
+        )
+        for i in range(120)
+    ], {})
+    return headers
+
+
+@pytest.mark.parametrize("params", [{}, {"view": "summary"}, {"fields": "title,tags,gratitude_items"}], ids=["full", "summary", "sparse"])
+def test_list_query_count_is_constant_across_page_sizes(client, diary, statements, params):
+    # Warm the principal cache, so every counted request authenticates the same way
+    client.get("/api/entries", params={"limit": 1}, headers=diary).raise_for_status()
+
+    counts = {}
+    for limit in PAGE_SIZES:
+        statements.clear()
+        response = client.get("/api/entries", params={**params, "limit": limit}, headers=diary)
+        assert len(response.json()) == limit
+        counts[limit] = len(statements)
+        assert response.headers["X-Query-Count"] == str(counts[limit])
+
+    assert len(set(counts.values())) == 1, counts
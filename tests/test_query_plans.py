@@ -0,0 +1,119 @@
+"""Every query the routers issue must be served by an index on seeded data.
+
+Each route is called once while its SQL is recorded, then every statement is
+EXPLAINed: a bare ``SCAN`` in SQLite's ``EXPLAIN QUERY PLAN`` (FTS5 virtual
+tables excepted), or a ``Seq Scan`` on PostgreSQL with ``enable_seqscan``
+off, which only happens when no index can serve the query, fails the test.
+"""
+import json
+import random
+import re
+
+import pytest
+from sqlalchemy import text
+
+from db.bulk import insert_entries
+from db.database import Base, Sessionlocal
+from db.models import User
+from schemas.diary import DiaryEntryCreate
+
+# SQLite before 3.36 prints "SCAN TABLE x", later versions "SCAN x"
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*VIRTUAL TABLE)")
+POSTGRES_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+SKIPPED = ("PRAGMA", "ANALYZE", "SET", "SHOW", "SAVEPOINT", "RELEASE", "ROLLBACK", "BEGIN", "COMMIT")
+MOODS = ["happy", "neutral", "sad", "excited", "calm", None]
+TAGS = ["work", "walk", "family", "travel", "reading", "music", "cooking", "garden", "friends", "sleep"]
+ENTRY = {"title": "Plan check", "content": "walk in the garden", "mood": "calm", "tags": ["walk"], "gratitude_items": ["tea"]}
+
+# (label, method, path, body); {entry_id} is an entry of the calling user
+ROUTES = [
+    ("create entry", "POST", "/api/entries", ENTRY),
+    ("bulk import", "POST", "/api/entries/bulk", "\n".join([json.dumps(ENTRY)] * 3)),
+    ("list entries", "GET", "/api/entries?limit=20", None),
+    ("list entries, skip", "GET", "/api/entries?skip=20&limit=20", None),
+    ("list summary", "GET", "/api/entries?view=summary&preview=50", None),
+    ("list by date", "GET", "/api/entries?from=2000-01-01&to=2100-01-01", None),
+    ("list by any tag", "GET", "/api/entries?tags=walk,music", None),
+    ("list by all tags", "GET", "/api/entries?tags=walk,music&match=all", None),
+    ("export", "GET", "/api/entries/export", None),
+    ("calendar", "GET", "/api/entries/calendar?year=2026", None),
+    ("on this day", "GET", "/api/entries/on-this-day?date=2027-10-16", None),
+    ("search", "GET", "/api/entries/search?q=garden", None),
+    ("read entry", "GET", "/api/entries/{entry_id}", None),
+    ("patch entry", "PATCH", "/api/entries/{entry_id}", {"title": "Edited", "tags": ["walk", "sleep"], "gratitude_items": ["tea"]}),
+    ("put entry", "PUT", "/api/entries/{entry_id}", {**ENTRY, "mood": "happy"}),
+    ("mood stats", "GET", "/api/stats/mood?granularity=week", None),
+    ("tags", "GET", "/api/tags", None),
+    ("tag suggest", "GET", "/api/tags/suggest?prefix=wa", None),
+    ("read user", "GET", "/api/users", None),
+    ("delete entry", "DELETE", "/api/entries/{entry_id}", None),
+    ("bulk delete by ids", "DELETE", "/api/entries?ids={entry_id}", None),
+    ("bulk delete by date", "DELETE", "/api/entries?from=2000-01-01&to=2000-12-31", None),
+    ("delete user", "DELETE", "/api/users", None),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded(engine):
+    """Enough users and entries, with fresh statistics, that a scan would cost more than an index"""
+    rng = random.Random(19)
+    with Sessionlocal() as db:
+        for n in range(20):
+            user = User(username=f"plans{n}", hashed_password="x")
+            db.add(user)
+            db.flush()
+            insert_entries(db, user.id, [
+                DiaryEntryCreate(
+                    title=f"Day {i}",
+                    content=" ".join(rng.choice(TAGS) for _ in range(40)),
+                    mood=rng.choice(MOODS),
+                    tags=rng.sample(TAGS, 2),
+                    gratitude_items=["coffee", "sunlight"],
+                )
+                for i in range(200)
+            ], {})
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def full_scans(conn, statement: str, parameters) -> list:
+    """The plan of ``statement`` if it reads a whole table, else []"""
+    if conn.dialect.name == "postgresql":
+        plan = [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+        scanned = [match.group(1) for line in plan for match in [POSTGRES_SEQ_SCAN.search(line)] if match]
+    else:
+        plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        scanned = [match.group(1) for line in plan for match in [SQLITE_SCAN.match(line)] if match]
+    # Aliases such as diary_entries_1 scan the table they stand for
+    bad = [name for name in scanned if re.sub(r"_\d+$", "", name) in Base.metadata.tables]
+    return plan if bad else []
+
+
+def test_scan_pattern_matches_old_and_new_sqlite_output():
+    assert SQLITE_SCAN.match("SCAN diary_entries").group(1) == "diary_entries"
+    assert SQLITE_SCAN.match("SCAN TABLE diary_entries").group(1) == "diary_entries"
+    assert SQLITE_SCAN.match("SCAN diary_entries_fts VIRTUAL TABLE INDEX 0:M1") is None
+    assert SQLITE_SCAN.match("SEARCH diary_entries USING INDEX ix_diary_entries_id (id=?)") is None
+
+
+@pytest.mark.parametrize("label, method, path, body", ROUTES, ids=[route[0] for route in ROUTES])
+def test_route_queries_use_indexes(client, engine, seeded, user, statements, label, method, path, body):
+    _, headers = user
+    entry_id = client.post("/api/entries", json=ENTRY, headers=headers).json()["id"]
+    statements.clear()
+
+    kwargs = {"content": body} if isinstance(body, str) else {"json": body}
+    response = client.request(method, path.format(entry_id=entry_id), headers=headers, **kwargs)
+    assert response.status_code < 400, response.text
+
+    failures = []
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in dict(statements).items():
+            if statement.lstrip().upper().startswith(SKIPPED):
+                continue
+            plan = full_scans(conn, statement, parameters)
+            if plan:
+                failures.append({"statement": " ".join(statement.split()), "plan": plan})
+    assert failures == []
@@ -0,0 +1,115 @@
+"""The list and detail routes' fast path is byte-identical to the response model.
+
+The reference is the chain the routes used before it: ORM objects,
+``from_attributes`` validation into DiaryEntryResponse, jsonable_encoder and
+Starlette's JSONResponse.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select, update
+
+from api.diary import entry_relations
+from core.fast_json import dumps
+from db.bulk import insert_entries
+from db.models import DiaryEntry, MoodEnum
+from schemas.diary import DiaryEntryCreate, DiaryEntryResponse
+
+response_list = TypeAdapter(List[DiaryEntryResponse])
+
+AWKWARD = [
+    'Quotes " and \\ backslashes',
+    # No NUL: PostgreSQL text columns cannot store it
+    "Control \x01\x1f\x7f characters\ttab\nnewline\r",
+    "Line\u2028and paragraph\u2029separators",
+    "Accents é ñ ü, CJK 日記, emoji 🌧️📓 and a lone ZWJ \u200d",
+    "<script>alert('html')</script> & ampersands",
+    "",
+]
+WORDS = "rain coffee river walk quiet friends book train home tired calm long".split()
+
+
+def reference_body(content) -> bytes:
+    if isinstance(content, list):
+        model = response_list.validate_python(content, from_attributes=True)
+    else:
+        model = DiaryEntryResponse.model_validate(content, from_attributes=True)
+    return JSONResponse(jsonable_encoder(model)).body
+
+
+def orm_entries(db, ids: List[int]) -> List[DiaryEntry]:
+    by_id = {
+        entry.id: entry
+        for entry in db.scalars(select(DiaryEntry).options(*entry_relations).where(DiaryEntry.id.in_(ids)))
+    }
+    return [by_id[entry_id] for entry_id in ids]
+
+
+@pytest.fixture
+def diary(db, user):
+    """A user with entries full of awkward text (control characters, non-BMP,
+    compressed content, no mood, no tags) spread over two years"""
+    user_id, headers = user
+    rng = random.Random(25)
+    insert_entries(db, user_id, [
+        DiaryEntryCreate(
+            title=rng.choice(AWKWARD + WORDS),
+            content=rng.choice(AWKWARD) + " ".join(rng.choices(WORDS, k=rng.choice([5, 200, 800]))),
+            mood=rng.choice([None, *MoodEnum]),
+            tags=rng.sample(WORDS + ["日記", 'we"ird'], k=rng.randint(0, 5)),
+            gratitude_items=[rng.choice(AWKWARD + WORDS) for _ in range(rng.randint(0, 4))],
+        )
+        for _ in range(250)
+    ], {})
+    start = datetime(2024, 1, 1)
+    for entry_id in db.scalars(select(DiaryEntry.id).where(DiaryEntry.user_id == user_id)).all():
+        db.execute(
+            update(DiaryEntry).where(DiaryEntry.id == entry_id)
+            .values(created_at=start + timedelta(seconds=rng.randrange(2 * 365 * 86400)))
+        )
+    db.commit()
+    return user_id, headers
+
+
+def test_list_pages_match_the_response_model(client, db, diary):
+    _, headers = diary
+    pages, cursor = 0, None
+    while True:
+        response = client.get("/api/entries", params={"limit": 100, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        ids = [entry["id"] for entry in response.json()]
+        assert response.content == reference_body(orm_entries(db, ids))
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert pages == 3
+
+
+def test_single_entries_match_the_response_model(client, db, diary):
+    user_id, headers = diary
+    for entry_id in db.scalars(select(DiaryEntry.id).where(DiaryEntry.user_id == user_id)).all():
+        response = client.get(f"/api/entries/{entry_id}", headers=headers)
+        assert response.content == reference_body(orm_entries(db, [entry_id])[0])
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2026, 10, 16, 9, 30, tzinfo=timezone.utc),
+    datetime(2026, 10, 16, 9, 30, 0, 120000, tzinfo=timezone.utc),
+    datetime(2026, 10, 16, 9, 30, 0, 7, tzinfo=timezone(timedelta(0))),
+    datetime(2026, 10, 16, 9, 30, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    datetime(2026, 10, 16, 9, 30, 15, 500, tzinfo=timezone(timedelta(hours=-8))),
+    datetime(2026, 10, 16, 9, 30, 0, 999999),
+], ids=str)
+def test_postgresql_timestamps_match_the_response_model(created_at):
+    # Aware and sub-second values as PostgreSQL drivers return them; SQLite never does
+    payload = {
+        "title": "t", "content": "c", "mood": MoodEnum.CALM, "tags": [{"name": "n", "id": 1}],
+        "gratitude_items": [{"content": "g", "id": 2, "entry_id": 3}],
+        "id": 3, "user_id": 4, "created_at": created_at,
+    }
+    assert dumps(payload) == reference_body(payload)